@@ -0,0 +1,122 @@
+"""JWT-аутентификация без обращения к таблице пользователей.
+
+Токены из ``RoleAccessToken`` несут роль, ``is_staff`` и версию токенов
+пользователя. По ним ``RoleJWTAuthentication`` строит лёгкого
+``RoleTokenUser``; полная запись ``User`` нужна лишь некоторым
+запросам (см. ``get_db_user``) и берётся через кеш пользователей
+внутри процесса (``api.user_cache``). Актуальная версия
+токенов берётся из кеша и сбрасывается при изменении или удалении
+пользователя (``api.signals``), поэтому старые токены перестают
+действовать после смены роли или удаления. Токены без этих claims
+обрабатываются ``CachedJWTAuthentication`` - тоже через этот кеш.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.user_cache import user_cache
+from reviews.models import UserRolesMixin
+
+ROLE_CLAIM = 'role'
+STAFF_CLAIM = 'is_staff'
+TOKEN_VERSION_CLAIM = 'token_version'
+REVOKED = -1
+
+
+def token_version_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов пользователя или REVOKED."""
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list(
+            'token_version', 'is_active'
+        ).first()
+        version = row[0] if row and row[1] else REVOKED
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    cache.delete(token_version_key(user_id))
+
+
+def forget_users(user_ids):
+    """Сбросить кеши пользователей, изменённых через update() без сигналов."""
+    cache.delete_many([token_version_key(user_id) for user_id in user_ids])
+    for user_id in user_ids:
+        user_cache.evict(user_id)
+
+
+class RoleAccessToken(AccessToken):
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[STAFF_CLAIM] = user.is_staff
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class RoleTokenUser(UserRolesMixin, TokenUser):
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @cached_property
+    def user(self):
+        user = user_cache.get(self.id)
+        if user is None:
+            user = get_user_model().objects.filter(pk=self.id).first()
+            if user is None:
+                # Пользователь удалён, а версия токенов ещё в кеше.
+                raise AuthenticationFailed(
+                    'Токен отозван.', code='token_revoked'
+                )
+            user_cache.put(self.id, user)
+        return user
+
+
+def get_db_user(user):
+    """Запись ``User`` для пользователя запроса."""
+    if isinstance(user, RoleTokenUser):
+        return user.user
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Загружает пользователя токена через LRU-кеш процесса."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = None if user_id is None else user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.put(user_id, user)
+        return user
+
+
+class RoleJWTAuthentication(CachedJWTAuthentication):
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user = RoleTokenUser(validated_token)
+        if get_token_version(user.id) != validated_token.get(
+            TOKEN_VERSION_CLAIM
+        ):
+            raise AuthenticationFailed(
+                'Токен отозван.', code='token_revoked'
+            )
+        return user
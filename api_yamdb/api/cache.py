@@ -0,0 +1,68 @@
+"""Кеш ответов на чтение произведений.
+
+Ключ записи включает номер версии, который хранится в том же кеше и
+увеличивается при любом изменении произведений, жанров, категорий и
+отзывов (см. ``api.signals``). После смены версии старые записи больше
+не читаются и вытесняются по таймауту, поэтому явно удалять их не нужно.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+TITLES_VERSION_KEY = 'titles:version'
+
+
+def get_titles_version():
+    version = cache.get(TITLES_VERSION_KEY)
+    if version is None:
+        # Начальное значение от времени, чтобы после вытеснения счётчика
+        # не совпасть с версией ещё живых старых записей.
+        cache.add(TITLES_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(TITLES_VERSION_KEY)
+    return version
+
+
+def bump_titles_version():
+    try:
+        cache.incr(TITLES_VERSION_KEY)
+    except ValueError:
+        get_titles_version()
+
+
+def titles_cache_key(request):
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    digest = hashlib.md5(
+        f'{request.get_host()}{request.path}?{query}'.encode('utf-8')
+    ).hexdigest()
+    return f'titles:{get_titles_version()}:{digest}'
+
+
+class TitleCacheMixin:
+    """Отдаёт list и retrieve из кеша, если данные не менялись."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, method, request, *args, **kwargs):
+        key = titles_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = method(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.TITLES_CACHE_TIMEOUT)
+        return response
@@ -1,23 +1,42 @@
 import django_filters
+from django.db.models import Count
+from rest_framework.filters import SearchFilter
 
-from reviews.models import Title
+from reviews.models import Category, Genre, Title
+from reviews.search import search_titles, search_users
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (
+    (MATCH_ANY, 'Любой из жанров'),
+    (MATCH_ALL, 'Все жанры'),
+)
+
+
+SEARCH_MODE_PREFIX = 'prefix'
+SEARCH_MODE_FULL = 'full'
+
+
+def split_slugs(value):
+    return sorted({slug.strip() for slug in value.split(',') if slug.strip()})
 
 
 class TitleFilter(django_filters.FilterSet):
-    """Фильтрация по полям для Title."""
+    """Фильтрация по полям для Title.
 
-    category = django_filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
-    name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
+    ``category`` и ``genre`` принимают один или несколько slug через
+    запятую и сравнивают их точно. Slug заранее переводятся в id, после
+    чего фильтрация идёт по индексированным внешним ключам, а жанры -
+    через подзапрос к промежуточной таблице, без дублей строк.
+    """
+
+    category = django_filters.CharFilter(method='filter_category')
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_match = django_filters.ChoiceFilter(
+        choices=MATCH_CHOICES,
+        method='filter_genre_match',
     )
+    name = django_filters.CharFilter(method='filter_name')
     year = django_filters.NumberFilter(
         field_name='year'
     )
@@ -25,3 +44,70 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year')
+
+    def filter_category(self, queryset, name, value):
+        slugs = split_slugs(value)
+        if not slugs:
+            return queryset
+        return queryset.filter(category_id__in=list(
+            Category.objects.filter(slug__in=slugs).values_list(
+                'id', flat=True
+            )
+        ))
+
+    def filter_genre(self, queryset, name, value):
+        slugs = split_slugs(value)
+        if not slugs:
+            return queryset
+        genre_ids = list(
+            Genre.objects.filter(slug__in=slugs).values_list('id', flat=True)
+        )
+        links = Title.genre.through.objects.filter(genre_id__in=genre_ids)
+        if self.form.cleaned_data.get('genre_match') == MATCH_ALL:
+            if len(genre_ids) < len(slugs):
+                return queryset.none()
+            links = links.values('title_id').annotate(
+                genres_count=Count('genre_id')
+            ).filter(genres_count=len(genre_ids))
+        return queryset.filter(pk__in=links.values('title_id'))
+
+    def filter_genre_match(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+    def filter_name(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+class UserSearchFilter(SearchFilter):
+    """Поиск пользователей по индексам вместо icontains по пяти полям.
+
+    По умолчанию слова ``search`` сравниваются с началом логина и email
+    и точно - с ролью. ``search_mode=full`` ищет подстроку в общем
+    столбце логина, email, имени и фамилии.
+    """
+
+    search_mode_param = 'search_mode'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        full = (
+            request.query_params.get(self.search_mode_param)
+            == SEARCH_MODE_FULL
+        )
+        return search_users(queryset, query, full=full)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                'name': self.search_mode_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Режим поиска: prefix или full.',
+                'schema': {
+                    'type': 'string',
+                    'enum': [SEARCH_MODE_PREFIX, SEARCH_MODE_FULL],
+                },
+            },
+        ]
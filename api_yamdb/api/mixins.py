@@ -0,0 +1,102 @@
+from itertools import chain
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+
+
+class ConditionalGetMixin:
+    """Условные GET для list и retrieve.
+
+    Валидаторы (ETag и время изменения) возвращает дешёвый
+    ``get_validators()``; при совпадении с If-None-Match или
+    If-Modified-Since ответ 304 отдаётся до выборки и сериализации.
+    """
+
+    def get_validators(self):
+        """Вернуть пару (etag, last_modified) или (None, None)."""
+        return None, None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, method, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        etag = quote_etag(etag) if etag else None
+        last_modified = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        response = method(request, *args, **kwargs)
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class SparseFieldsetMixin:
+    """Поддержка параметра ``fields`` в запросах на чтение.
+
+    Сериализатор отдаёт только запрошенные поля, а запрос к базе
+    сужается через ``only()``. ``sparse_only`` сопоставляет полю ответа
+    поля модели (по умолчанию - одноимённое поле), связи из
+    ``sparse_select_related`` и ``sparse_prefetch_related`` подгружаются,
+    только если запрошено соответствующее поле.
+    """
+
+    fields_query_param = 'fields'
+    sparse_always_load = ('id',)
+    sparse_only = {}
+    sparse_select_related = {}
+    sparse_prefetch_related = {}
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self.parse_requested_fields()
+        return self._requested_fields
+
+    def parse_requested_fields(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+        requested = {name.strip() for name in value.split(',')} - {''}
+        unknown = requested - set(self.get_serializer_class().Meta.fields)
+        if unknown:
+            raise ValidationError({self.fields_query_param: [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+            ]})
+        return requested
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['requested_fields'] = self.get_requested_fields()
+        return context
+
+    def apply_sparse_fieldset(self, queryset):
+        requested = self.get_requested_fields()
+        for field, related in self.sparse_select_related.items():
+            if requested is None or field in requested:
+                queryset = queryset.select_related(related)
+        for field, related in self.sparse_prefetch_related.items():
+            if requested is None or field in requested:
+                queryset = queryset.prefetch_related(related)
+        if requested is None:
+            return queryset
+        return queryset.only(*self.sparse_always_load, *chain.from_iterable(
+            self.sparse_only.get(field, (field,)) for field in requested
+        ))
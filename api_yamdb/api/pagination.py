@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TitlePagination(PageNumberPagination):
+    """Пагинация произведений с опциональным keyset-режимом.
+
+    Без параметра ``cursor`` работает как обычная PageNumberPagination.
+    Если параметр передан (для первой страницы - пустым: ``?cursor=``),
+    страница выбирается условием по ключу (-year, name, id) через
+    составной индекс, без OFFSET и COUNT(*), поэтому любая страница
+    стоит столько же, сколько первая.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering = ('-year', 'name', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(*position))
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        if results:
+            last = results[-1]
+            self.next_position = (last.year, last.name, last.pk)
+        return results
+
+    @staticmethod
+    def after(year, name, pk):
+        """Условие «строго после (year, name, pk)» для (-year, name, id)."""
+        return (
+            Q(year__lt=year)
+            | Q(year=year, name__gt=name)
+            | Q(year=year, name=name, pk__gt=pk)
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            year, name, pk = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+            return int(year), str(name), int(pk)
+        except (binascii.Error, TypeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(position, ensure_ascii=False).encode('utf-8')
+        ).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -1,27 +1,48 @@
+from collections import namedtuple
+
 from rest_framework.permissions import BasePermission
 from rest_framework import permissions
 
+UserRoles = namedtuple(
+    'UserRoles', ('is_authenticated', 'is_admin', 'is_moderator')
+)
+
+
+def get_user_roles(request):
+    """Флаги ролей пользователя, вычисленные один раз за запрос."""
+    roles = getattr(request, '_user_roles', None)
+    if roles is None:
+        user = request.user
+        authenticated = user.is_authenticated
+        roles = UserRoles(
+            is_authenticated=authenticated,
+            is_admin=authenticated and user.is_admin,
+            is_moderator=authenticated and user.is_moderator,
+        )
+        request._user_roles = roles
+    return roles
+
 
 class IsAdmin(BasePermission):
 
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_admin
+        return get_user_roles(request).is_admin
 
 
 class IsModerator(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_moderator
+        return get_user_roles(request).is_moderator
 
 
 class IsAuthorOrModeratorOrAdmin(BasePermission):
     def has_object_permission(self, request, view, obj):
-        request_user = request.user
+        # Сравниваем id, не загружая автора из базы.
+        roles = get_user_roles(request)
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
-            or (request_user.is_authenticated
-                and (request_user.is_moderator or request_user.is_admin)
-                )
+            or obj.author_id == request.user.pk
+            or roles.is_moderator
+            or roles.is_admin
         )
 
 
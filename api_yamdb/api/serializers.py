@@ -2,10 +2,9 @@ from django.conf import settings
 
 from reviews.models import MAX_USERNAME_LENGTH, MAX_EMAIL_LENGTH, User
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
 
 from reviews.models import (
-    Category, Comment, Genre, Review, Title, User
+    ROLE_CHOICES, Category, Comment, Genre, Review, Title, User
 )
 
 from reviews.validators import check_username
@@ -16,6 +15,17 @@ class UsernameValidatorMixin:
         return check_username(username)
 
 
+class SparseFieldsMixin:
+    """Оставляет только поля, запрошенные параметром ``fields``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('requested_fields')
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
 class SignupSerializer(UsernameValidatorMixin, serializers.Serializer):
     username = serializers.CharField(
         required=True,
@@ -54,6 +64,30 @@ class UserMeSerializer(UserSerializer):
         read_only_fields = ('role',)
 
 
+class UserBulkSerializer(serializers.Serializer):
+    SET_ROLE = 'set_role'
+    DELETE = 'delete'
+    ACTIONS = (
+        (SET_ROLE, 'Сменить роль'),
+        (DELETE, 'Удалить'),
+    )
+
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=MAX_USERNAME_LENGTH),
+        allow_empty=False,
+        max_length=settings.USERS_BULK_MAX_SIZE,
+    )
+    action = serializers.ChoiceField(choices=ACTIONS)
+    role = serializers.ChoiceField(choices=ROLE_CHOICES, required=False)
+
+    def validate(self, data):
+        if data['action'] == self.SET_ROLE and 'role' not in data:
+            raise serializers.ValidationError(
+                {'role': ['Укажите новую роль.']}
+            )
+        return data
+
+
 class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -68,7 +102,7 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
-class TitleViewSerializer(serializers.ModelSerializer):
+class TitleViewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer()
     genre = GenreSerializer(many=True)
     rating = serializers.IntegerField(default=None)
@@ -102,7 +136,7 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
         return TitleViewSerializer(instance).data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -113,7 +147,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username',
@@ -122,15 +156,3 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
-
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return data
-
-        if (Review.objects.filter(
-            title_id=self.context.get('view').kwargs.get('title_id'),
-            author=self.context.get('request').user
-        ).exists()
-        ):
-            raise ValidationError('Отзыв уже существует.')
-        return data
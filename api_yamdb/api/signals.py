@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import forget_token_version, forget_users
+from api.cache import bump_titles_version
+from api.throttling import forget_code_sent
+from api.user_cache import user_cache
+from reviews.models import Category, Genre, Review, Title, User
+from reviews.signals import data_imported
+
+
+def invalidate_titles_cache(sender, **kwargs):
+    # Версия меняется только после фиксации транзакции: иначе чтение
+    # между сменой версии и фиксацией сохранит в кеш старые данные под
+    # новой версией.
+    transaction.on_commit(bump_titles_version)
+
+
+for model in (Title, Review, Genre, Category):
+    post_save.connect(invalidate_titles_cache, sender=model)
+    post_delete.connect(invalidate_titles_cache, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_titles_cache_on_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_titles_cache(sender)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_token_version(instance.pk)
+    user_cache.evict(instance.pk)
+    if kwargs['signal'] is post_delete:
+        forget_code_sent(instance.username)
+
+
+@receiver(data_imported)
+def invalidate_imported(sender, ids, **kwargs):
+    if any(ids.get(model) for model in (Title, Review, Genre, Category)):
+        invalidate_titles_cache(sender)
+    if ids.get(User):
+        forget_users(ids[User])
@@ -0,0 +1,86 @@
+import hashlib
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Ограничение частоты по алгоритму «ведро токенов».
+
+    Ведро вмещает ``num_requests`` токенов и наполняется с той же
+    скоростью за ``duration`` секунд: короткий всплеск до размера
+    ведра проходит, дальше запросы пропускаются не чаще заданной скорости.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill_rate = self.num_requests / self.duration
+        tokens, updated_at = self.cache.get(
+            self.key, (self.num_requests, now)
+        )
+        tokens = min(
+            self.num_requests, tokens + (now - updated_at) * refill_rate
+        )
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill_rate
+            return False
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Запросы регистрации и получения токена с одного IP."""
+
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class AuthIdentityThrottle(TokenBucketThrottle):
+    """Запросы для одного email (регистрация) или username (токен)."""
+
+    scope = 'auth_identity'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return None
+        identity = request.data.get('email') or request.data.get('username')
+        if not identity or not isinstance(identity, str):
+            return None
+        # Email бывает длиннее допустимого ключа кеша, поэтому в ключ
+        # идёт хеш.
+        digest = hashlib.sha256(
+            identity.strip().lower().encode()
+        ).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': digest}
+
+
+def resend_key(username):
+    return f'signup-sent:{username}'
+
+
+def is_code_recently_sent(username, email):
+    """Код для этой пары уже отправлен и ещё действует окно повтора."""
+    return cache.get(resend_key(username)) == email
+
+
+def remember_code_sent(username, email):
+    cache.set(resend_key(username), email, settings.SIGNUP_RESEND_WINDOW)
+
+
+def forget_code_sent(username):
+    cache.delete(resend_key(username))
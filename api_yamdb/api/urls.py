@@ -9,7 +9,7 @@ from api.views import (
     ReviewViewSet,
     signup,
     # TokenObtainView,
-    UserViewSet, token_obtain,
+    UserViewSet, token_obtain, user_cache_stats,
 )
 
 router_v1 = DefaultRouter()
@@ -30,6 +30,7 @@ router_v1.register(
 auth_patterns = [
     path('signup/', signup, name='signup'),
     path('token/', token_obtain, name='token_obtain'),
+    path('user-cache/', user_cache_stats, name='user_cache_stats'),
 ]
 
 urlpatterns = [
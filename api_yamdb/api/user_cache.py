@@ -0,0 +1,69 @@
+"""Кеш пользователей внутри процесса для JWT-аутентификации.
+
+Ограниченный по размеру LRU-кеш с временем жизни записей. Записи
+вытесняются сигналами при сохранении и удалении пользователя; в других
+процессах устаревшая запись живёт не дольше ``AUTH_USER_CACHE_TTL``.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class UserLRUCache:
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Копия закешированного пользователя или None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            # Копия, чтобы изменения в запросе не попали в кеш.
+            return copy.copy(entry[1])
+
+    def put(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (
+                time.monotonic() + self.ttl, copy.copy(user)
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+
+user_cache = UserLRUCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL
+)
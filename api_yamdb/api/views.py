@@ -1,21 +1,32 @@
 import random
 
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (
     status, viewsets, permissions, filters, mixins
 )
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (
+    action, api_view, permission_classes, throttle_classes
+)
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-
-from api.filters import TitleFilter
+from rest_framework.settings import api_settings
+
+from api.authentication import RoleAccessToken, forget_users, get_db_user
+from api.cache import TitleCacheMixin, get_titles_version
+from api.filters import TitleFilter, UserSearchFilter
+from api.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from api.pagination import TitlePagination
+from api.throttling import (
+    AuthIdentityThrottle, AuthIPThrottle, forget_code_sent,
+    is_code_recently_sent, remember_code_sent
+)
+from api.user_cache import user_cache
 from api.serializers import (
     CategorySerializer,
     CommentSerializer,
@@ -24,61 +35,147 @@ from api.serializers import (
     TitleCreateUpdateSerializer,
     ReviewSerializer
 )
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.codes import check_code, store_code
+from reviews.emails import queue_email
+from reviews.models import Category, Comment, Genre, Review, Title, User
 from .permissions import IsAdmin, IsAuthorOrModeratorOrAdmin, IsAdminOrReadOnly
 from .serializers import (
     SignupSerializer,
     TokenObtainSerializer,
+    UserBulkSerializer,
     UserSerializer,
     UserMeSerializer
 )
 
 USERNAME_ERROR_MESSAGE = 'Пользователь с таким username уже есть'
 EMAIL_ERROR_MESSAGE = 'Пользователь с таким email уже есть'
+REVIEW_EXISTS_MESSAGE = 'Отзыв уже существует.'
+
+BULK_UPDATED = 'updated'
+BULK_DELETED = 'deleted'
+BULK_UNCHANGED = 'unchanged'
+BULK_NOT_FOUND = 'not_found'
+BULK_FORBIDDEN = 'forbidden'
+
+
+def find_signup_user(username, email):
+    """Найти пользователя с этой парой username и email одним запросом.
+
+    Вернуть его pk, None - если нет ни username, ни email, а если
+    одно из них занято другим пользователем - ValidationError.
+    """
+    matches = list(User.objects.filter(
+        Q(username=username) | Q(email=email)
+    ).values_list('pk', 'username', 'email')[:2])
+    for pk, match_username, match_email in matches:
+        if match_username == username and match_email == email:
+            return pk
+    if any(match[1] == username for match in matches):
+        raise ValidationError({'username': [USERNAME_ERROR_MESSAGE]})
+    if matches:
+        raise ValidationError({'email': [EMAIL_ERROR_MESSAGE]})
+    return None
+
+
+def save_signup_code(username, email, confirmation_code):
+    """Создать пользователя, если его нет, и выдать ему код.
+
+    Строку пользователя пишет только первая регистрация, код
+    хранится в отдельной таблице (см. ``reviews.codes``).
+    """
+    pk = find_signup_user(username, email)
+    new_user = pk is None
+    if new_user:
+        try:
+            with transaction.atomic():
+                pk = User.objects.create(username=username, email=email).pk
+        except IntegrityError:
+            # Параллельная регистрация заняла username или email.
+            pk = find_signup_user(username, email)
+            if pk is None:
+                raise
+            new_user = False
+    store_code(pk, confirmation_code, new_user=new_user)
+
+
+def bulk_change_users(usernames, action, role, acting_user_id):
+    """Сменить роль или удалить пользователей одной транзакцией.
+
+    Роль меняется одним UPDATE вместе с версией токенов, удаление -
+    одним вызовом delete() для всего набора. Вернуть статус для
+    каждого username: себя изменить нельзя, роль может уже совпадать.
+    """
+    statuses = {}
+    target_ids = []
+    with transaction.atomic():
+        for pk, username, user_role in User.objects.filter(
+            username__in=usernames
+        ).values_list('pk', 'username', 'role'):
+            if pk == acting_user_id:
+                statuses[username] = BULK_FORBIDDEN
+            elif action == UserBulkSerializer.SET_ROLE and user_role == role:
+                statuses[username] = BULK_UNCHANGED
+            else:
+                statuses[username] = (
+                    BULK_UPDATED if action == UserBulkSerializer.SET_ROLE
+                    else BULK_DELETED
+                )
+                target_ids.append(pk)
+        users = User.objects.filter(pk__in=target_ids)
+        if action == UserBulkSerializer.SET_ROLE:
+            users.update(role=role, token_version=F('token_version') + 1)
+            # update() не отправляет сигналов: кеши сбрасываем сами.
+            transaction.on_commit(lambda: forget_users(target_ids))
+        else:
+            users.delete()
+    return [
+        {'username': username,
+         'status': statuses.get(username, BULK_NOT_FOUND)}
+        for username in dict.fromkeys(usernames)
+    ]
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthIPThrottle, AuthIdentityThrottle])
 def signup(request):
     serializer = SignupSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     username = serializer.validated_data['username']
     email = serializer.validated_data['email']
-
-    try:
-        user, _ = User.objects.get_or_create(username=username, email=email)
-    except IntegrityError:
-        if User.objects.filter(username=username).exists():
-            raise ValidationError({'username': [USERNAME_ERROR_MESSAGE]})
-        raise ValidationError({'email': [EMAIL_ERROR_MESSAGE]})
+    response = Response(
+        {'email': email, 'username': username},
+        status=status.HTTP_200_OK
+    )
+    # Повтор в пределах окна: прежний код ещё действует,
+    # не пишем в базу и не отправляем письмо снова.
+    if is_code_recently_sent(username, email):
+        return response
 
     confirmation_code = ''.join(
         random.choices(
             settings.CONFIRMATION_CODE_CHARS,
             k=settings.CONFIRMATION_CODE_LENGTH
         ))
-    user.confirmation_code = confirmation_code
-    user.save(update_fields=['confirmation_code'])
-
-    send_mail(
-        subject='Код подтверждения YaMDb',
-        message=(
-            f'Ваш код подтверждения: {confirmation_code}\n'
-            'Используйте код для получения токена.'
-        ),
-        from_email=settings.NOREPLY_EMAIL,
-        recipient_list=[email],
-        fail_silently=False,
-    )
-
-    return Response(
-        {'email': email, 'username': username},
-        status=status.HTTP_200_OK
-    )
+    # Письмо ставится в очередь в той же транзакции, что и код:
+    # отправит его команда send_emails, запрос почту не ждёт.
+    with transaction.atomic():
+        save_signup_code(username, email, confirmation_code)
+        queue_email(
+            recipient=email,
+            subject='Код подтверждения YaMDb',
+            body=(
+                f'Ваш код подтверждения: {confirmation_code}\n'
+                'Используйте код для получения токена.'
+            ),
+        )
+    remember_code_sent(username, email)
+    return response
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthIPThrottle, AuthIdentityThrottle])
 def token_obtain(request):
     serializer = TokenObtainSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -86,29 +183,31 @@ def token_obtain(request):
     username = serializer.validated_data['username']
     confirmation_code = serializer.validated_data['confirmation_code']
 
-    user = get_object_or_404(User, username=username)
-
-    code_ok = (
-        (len(confirmation_code) == settings.CONFIRMATION_CODE_LENGTH)
-        and (confirmation_code == user.confirmation_code))
+    user = get_object_or_404(
+        User.objects.select_related('confirmation'), username=username
+    )
 
-    if not code_ok:
-        if user.confirmation_code != '':
-            user.confirmation_code = ''
-            user.save(update_fields=['confirmation_code'])
+    if not check_code(user, confirmation_code):
+        # Следующая регистрация должна выслать новый код.
+        forget_code_sent(username)
         raise ValidationError('Неверный код подтверждения:')
 
-    token = AccessToken.for_user(user)
+    token = RoleAccessToken.for_user(user)
     return Response({'token': str(token)}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def user_cache_stats(request):
+    return Response(user_cache.stats())
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('username')
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
     lookup_field = 'username'
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['username', 'email', 'first_name', 'last_name', 'role']
+    filter_backends = [UserSearchFilter]
     http_method_names = ['get', 'patch', 'post', 'head',
                          'options', 'delete']  # без 'put'
 
@@ -119,11 +218,12 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def me(self, request):
+        user = get_db_user(request.user)
         if request.method == 'GET':
-            return Response(UserSerializer(request.user).data)
+            return Response(UserSerializer(user).data)
 
         serializer = UserMeSerializer(
-            request.user,
+            user,
             data=request.data,
             partial=True,
         )
@@ -131,6 +231,21 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path=settings.USERS_BULK_PATH,
+    )
+    def bulk(self, request):
+        serializer = UserBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': bulk_change_users(
+            serializer.validated_data['usernames'],
+            serializer.validated_data['action'],
+            serializer.validated_data.get('role'),
+            request.user.pk,
+        )})
+
 
 class BaseViewSet(
     mixins.ListModelMixin,
@@ -156,14 +271,44 @@ class GenreViewSet(BaseViewSet):
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).order_by(*Title._meta.ordering)
+class TitleViewSet(
+    ConditionalGetMixin,
+    TitleCacheMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Title.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    pagination_class = TitlePagination
     permission_classes = (IsAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
+    # Поля сортировки нужны keyset-пагинации.
+    sparse_always_load = ('id', 'year', 'name')
+    sparse_only = {
+        'rating': ('rating_sum', 'rating_count'),
+        'genre': (),
+        'category': ('category', 'category__name', 'category__slug'),
+    }
+    sparse_select_related = {'category': 'category'}
+    sparse_prefetch_related = {'genre': 'genre'}
+
+    def get_queryset(self):
+        return self.apply_sparse_fieldset(super().get_queryset())
+
+    def get_validators(self):
+        if self.action == 'list':
+            return f'titles-{get_titles_version()}', None
+        try:
+            version = Title.objects.filter(
+                pk=self.kwargs['pk']
+            ).values_list('version', flat=True).first()
+        except (TypeError, ValueError):
+            # Некорректный id: 404 вернёт обычный get_object().
+            return None, None
+        if version is None:
+            return None, None
+        return f'title-{self.kwargs["pk"]}-{version}', None
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -171,36 +316,87 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleCreateUpdateSerializer
 
 
-class CommentReviewViewSet(viewsets.ModelViewSet):
-    """Базовый вьюсет для CommentViewSet и ReviewViewSet."""
+class CommentReviewViewSet(
+    ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
+    """Базовый вьюсет для CommentViewSet и ReviewViewSet.
+
+    Родительский объект из URL находится одним запросом, который
+    учитывает все id маршрута; 404 - только если этот запрос пуст.
+    """
 
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly, IsAuthorOrModeratorOrAdmin,
     )
     http_method_names = ['get', 'post', 'patch', 'delete']
+    sparse_only = {'author': ('author', 'author__username')}
+    sparse_select_related = {'author': 'author'}
+    # Имя обратной связи родителя с объектами вьюсета.
+    children_name = None
+
+    def get_parent_queryset(self):
+        raise NotImplementedError
+
+    def get_parent(self):
+        return get_object_or_404(self.get_parent_queryset())
+
+    def get_validators(self):
+        # Версия родителя растёт при любом изменении дочерних объектов и
+        # при смене username их авторов, заодно этот запрос проверяет,
+        # что родитель существует. Last-Modified не отдаётся: pub_date
+        # не меняется при правке и уходит назад при удалении.
+        row = self.get_parent_queryset().values_list(
+            'pk', 'version'
+        ).first()
+        if row is None:
+            raise Http404
+        pk, version = row
+        return f'{self.children_name}-{pk}-{version}', None
 
 
 class CommentViewSet(CommentReviewViewSet):
     serializer_class = CommentSerializer
+    children_name = 'comments'
 
-    def get_review(self):
-        return get_object_or_404(Review, pk=self.kwargs['review_id'])
+    def get_parent_queryset(self):
+        return Review.objects.filter(
+            pk=self.kwargs['review_id'], title_id=self.kwargs['title_id']
+        )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.apply_sparse_fieldset(Comment.objects.filter(
+            review_id=self.kwargs['review_id'],
+            review__title_id=self.kwargs['title_id'],
+        ))
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(
+            author=get_db_user(self.request.user), review=self.get_parent()
+        )
 
 
 class ReviewViewSet(CommentReviewViewSet):
     serializer_class = ReviewSerializer
+    children_name = 'reviews'
 
-    def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs['title_id'])
+    def get_parent_queryset(self):
+        return Title.objects.filter(pk=self.kwargs['title_id'])
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.apply_sparse_fieldset(
+            Review.objects.filter(title_id=self.kwargs['title_id'])
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        title = self.get_parent()
+        # Повторный отзыв отсекает ограничение unique_author_title:
+        # без лишнего SELECT и без гонки между проверкой и вставкой.
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=get_db_user(self.request.user), title=title
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_EXISTS_MESSAGE]}
+            )
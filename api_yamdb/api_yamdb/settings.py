@@ -101,7 +101,7 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.RoleJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -113,15 +113,54 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('AUTH_IP_THROTTLE_RATE', '30/min'),
+        'auth_identity': os.getenv('AUTH_IDENTITY_THROTTLE_RATE', '5/min'),
+    },
 }
 
 AUTH_USER_MODEL = 'reviews.User'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+    }
+}
+TITLES_CACHE_TIMEOUT = 15 * 60
+# Сколько процесс доверяет закешированной версии токенов пользователя.
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+# LRU-кеш пользователей JWT-аутентификации внутри процесса.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'emails'
+# Письма ставятся в очередь и рассылаются командой send_emails --loop.
+# В режиме EMAIL_OUTBOX_EAGER письмо отправляется сразу после запроса
+# (удобно при разработке без обработчика очереди).
+EMAIL_OUTBOX_EAGER = os.getenv('EMAIL_OUTBOX_EAGER', 'False') == 'True'
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+EMAIL_OUTBOX_LEASE = 5 * 60
 
 CONFIRMATION_CODE_LENGTH = 5
 CONFIRMATION_CODE_CHARS = string.digits
+# Срок действия кода, сек., и число неверных попыток до его сгорания.
+CONFIRMATION_CODE_TTL = 24 * 60 * 60
+CONFIRMATION_CODE_MAX_ATTEMPTS = 3
+CONFIRMATION_CODE_PURGE_BATCH_SIZE = 1000
+
+# Размер пачки (и транзакции) при импорте CSV.
+CSV_IMPORT_BATCH_SIZE = 1000
+# Потоки, разбирающие CSV-файлы; в базу пишет один поток.
+CSV_IMPORT_WORKERS = 4
+# Повторная регистрация в течение окна не шлёт новый код, сек.
+SIGNUP_RESEND_WINDOW = 60
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
@@ -131,5 +170,8 @@ SIMPLE_JWT = {
 }
 
 FORBIDDEN_USERNAME = 'me'
+# Адрес массовых операций: /api/v1/users/bulk/, такой username тоже запрещён.
+USERS_BULK_PATH = 'bulk'
+USERS_BULK_MAX_SIZE = 1000
 USERNAME_REGEX = r'^[\w.@+-]+\Z'
 NOREPLY_EMAIL = 'noreply@yamdb.mail.ru'
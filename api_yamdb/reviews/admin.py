@@ -1,6 +1,9 @@
 from django.contrib import admin
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (
+    Category, Comment, ConfirmationCode, Genre, OutgoingEmail, Review, Title,
+    User
+)
 
 MAX_DISPLAY_LENGTH = 30
 
@@ -32,3 +35,5 @@ admin.site.register(Category)
 admin.site.register(Genre)
 admin.site.register(Review)
 admin.site.register(Comment)
+admin.site.register(OutgoingEmail)
+admin.site.register(ConfirmationCode)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        from reviews import signals  # noqa: F401
+        from reviews.search import ensure_title_search_index
+
+        post_migrate.connect(ensure_title_search_index, sender=self)
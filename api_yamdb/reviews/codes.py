@@ -0,0 +1,87 @@
+"""Хранение кодов подтверждения.
+
+Коды живут в таблице ``ConfirmationCode`` со сроком действия и
+счётчиком неверных попыток. Регистрация и вход пишут только в неё,
+строка пользователя при этом не меняется. Просроченные и сгоревшие
+коды удаляет пачками команда ``purge_confirmation_codes``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from reviews.models import ConfirmationCode
+
+
+def code_fields(code):
+    return {
+        'code': code,
+        'expires_at': timezone.now() + timedelta(
+            seconds=settings.CONFIRMATION_CODE_TTL
+        ),
+        'attempts': 0,
+    }
+
+
+def store_code(user_id, code, new_user=False):
+    """Выдать пользователю новый код вместо прежнего.
+
+    Для только что созданного пользователя это один INSERT,
+    для существующего - обычно один UPDATE.
+    """
+    fields = code_fields(code)
+    codes = ConfirmationCode.objects.filter(user_id=user_id)
+    if not new_user and codes.update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            ConfirmationCode.objects.create(user_id=user_id, **fields)
+    except IntegrityError:
+        # Код этому пользователю успел выдать параллельный запрос.
+        codes.update(**fields)
+
+
+def check_code(user, code):
+    """Проверить код; неверная попытка увеличивает счётчик.
+
+    ``user`` должен быть загружен с ``select_related('confirmation')``.
+    """
+    try:
+        confirmation = user.confirmation
+    except ConfirmationCode.DoesNotExist:
+        return False
+    max_attempts = settings.CONFIRMATION_CODE_MAX_ATTEMPTS
+    if (confirmation.expires_at <= timezone.now()
+            or confirmation.attempts >= max_attempts):
+        return False
+    if constant_time_compare(code, confirmation.code):
+        return True
+    ConfirmationCode.objects.filter(pk=confirmation.pk).update(
+        attempts=F('attempts') + 1
+    )
+    return False
+
+
+def stale_codes(now):
+    return ConfirmationCode.objects.filter(
+        Q(expires_at__lte=now)
+        | Q(attempts__gte=settings.CONFIRMATION_CODE_MAX_ATTEMPTS)
+    )
+
+
+def purge_codes(batch_size):
+    """Удалить просроченные и сгоревшие коды пачками.
+
+    Каждая пачка удаляется отдельным коротким запросом, чтобы не держать
+    блокировку на запись всё время очистки.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        pks = list(stale_codes(now).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += ConfirmationCode.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,131 @@
+"""Отправка писем через таблицу-очередь (outbox).
+
+Запрос только добавляет строку ``OutgoingEmail`` в своей транзакции,
+а письма рассылает команда ``send_emails``: пачками, через одно
+соединение с почтовым сервером, с повторными попытками и растущей
+задержкой. При ``EMAIL_OUTBOX_EAGER`` письмо отправляется сразу после
+фиксации транзакции (удобно при разработке и в тестах).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+MAX_ERROR_LENGTH = 1000
+
+
+def queue_email(recipient, subject, body):
+    if not settings.EMAIL_OUTBOX_EAGER:
+        return OutgoingEmail.objects.create(
+            recipient=recipient, subject=subject, body=body
+        )
+    # Письмо сразу создаётся арендованным, чтобы send_emails --loop не
+    # отправил его второй раз, пока оно отправляется здесь.
+    email = OutgoingEmail.objects.create(
+        recipient=recipient, subject=subject, body=body,
+        send_after=lease_until(timezone.now()),
+    )
+    transaction.on_commit(lambda: send_emails([email]))
+    return email
+
+
+def lease_until(now):
+    return now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+
+
+def pending_emails(now):
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        send_after__lte=now,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+def claim_emails(batch_size):
+    """Забрать пачку писем, отложив их на время аренды.
+
+    Пока письма отправляются, другой обработчик их не возьмёт, а если
+    этот обработчик упадёт, письма снова станут доступны после аренды.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            pending_emails(now).select_for_update(skip_locked=True)
+            [:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(send_after=lease_until(now))
+    return emails
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_MAX_RETRY_DELAY,
+    ))
+
+
+def mark_failed(emails, error):
+    """Отложить письма до следующей попытки, запомнив ошибку."""
+    for email in emails:
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            attempts=F('attempts') + 1,
+            send_after=timezone.now() + retry_delay(email.attempts + 1),
+            last_error=repr(error)[:MAX_ERROR_LENGTH],
+        )
+
+
+def send_emails(emails, connection=None):
+    """Отправить письма через одно соединение; вернуть (sent, failed)."""
+    connection = connection or get_connection()
+    # Любая ошибка бэкенда - повод повторить позже, а не остановить
+    # обработчик очереди или запрос, отправляющий письмо сразу.
+    try:
+        connection.open()
+    except Exception as error:
+        mark_failed(emails, error)
+        return 0, len(emails)
+    sent_ids = []
+    failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=settings.NOREPLY_EMAIL,
+                to=[email.recipient],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                failed += 1
+                mark_failed([email], error)
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            # Письма уже отправлены, ошибка закрытия на них не влияет.
+            pass
+    OutgoingEmail.objects.filter(pk__in=sent_ids).update(
+        sent_at=timezone.now()
+    )
+    return len(sent_ids), failed
+
+
+def send_pending_emails(batch_size):
+    """Разослать все готовые к отправке письма; вернуть (sent, failed)."""
+    total_sent = total_failed = 0
+    while emails := claim_emails(batch_size):
+        sent, failed = send_emails(emails)
+        total_sent += sent
+        total_failed += failed
+    return total_sent, total_failed
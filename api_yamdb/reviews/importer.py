@@ -0,0 +1,619 @@
+"""Массовый импорт данных из CSV.
+
+Файл обрабатывается потоком генераторов: чтение строк, проверка и
+преобразование в объекты, запись пачками. В памяти одновременно
+держится только одна пачка строк, а каждая пачка записывается в своей
+короткой транзакции, так что блокировка записи в SQLite не держится
+всё время импорта.
+
+Id всех таблиц, на которые ссылаются строки, загружаются один раз и
+хранятся в памяти: внешние ключи проверяются без запросов к базе, а
+по тем же множествам строки делятся на новые (``bulk_create``) и
+существующие (``bulk_update``).
+
+Для каждой записанной строки сохраняется отпечаток её содержимого
+(``ImportFingerprint``) с меткой импорта. Отпечатки читаются пачками
+вместе со строками: в режиме ``incremental`` строки с прежним
+отпечатком не пишутся, им только обновляется метка. Строки прошлых
+импортов, которые остались без новой метки, ``delete_missing()``
+находит запросом к базе.
+
+Массовые операции не вызывают ``save()`` и сигналов моделей, поэтому
+производные поля (поиск, рейтинги, версии) заполняются здесь, а
+кеши API сбрасываются по сигналу ``data_imported``.
+"""
+import csv
+import hashlib
+import os
+import queue
+import threading
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F
+
+from reviews.models import (
+    Category, Comment, Genre, ImportFingerprint, Review, Title, User
+)
+from reviews.ratings import rebuild_ratings
+from reviews.signals import (
+    bump_author_versions, bump_versions, data_imported
+)
+
+# Сколько пачек одной таблицы может ждать записи.
+QUEUE_BATCHES = 2
+POLL_INTERVAL = 0.1
+# Метки в очереди пачек: файл закончился / файла нет.
+DONE = object()
+MISSING = object()
+
+TableSpec = namedtuple('TableSpec', (
+    'name',         # имя шага импорта
+    'model',        # модель таблицы
+    'file_name',    # имя CSV-файла в каталоге данных
+    'label',        # «Импортировано N <label>»
+    'build',        # строка CSV -> несохранённый объект модели
+    'fields',       # поля, которые обновляются у существующих строк;
+                    # None - таблица связей: уже существующие пропускаются
+    'references',   # {атрибут внешнего ключа: модель}
+))
+GenreTitle = Title.genre.through
+# Родитель, чья версия или рейтинг зависят от строки таблицы.
+PARENT_FIELDS = {Review: 'title_id', Comment: 'review_id'}
+
+
+def build_user(row):
+    user = User(
+        id=row['id'],
+        username=row['username'],
+        email=row['email'],
+        role=row.get('role', 'user') or 'user',
+        bio=row.get('bio', ''),
+        first_name=row.get('first_name', ''),
+        last_name=row.get('last_name', ''),
+    )
+    user.fill_search_fields()
+    return user
+
+
+def build_category(row):
+    return Category(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def build_genre(row):
+    return Genre(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def build_title(row):
+    title = Title(
+        id=row['id'],
+        name=row['name'],
+        year=row['year'],
+        category_id=row['category'],
+        description=row.get('description', ''),
+    )
+    title.fill_search_name()
+    return title
+
+
+def build_genre_title(row):
+    return GenreTitle(title_id=row['title_id'], genre_id=row['genre_id'])
+
+
+def build_review(row):
+    return Review(
+        id=row['id'],
+        title_id=row['title_id'],
+        text=row['text'],
+        author_id=row['author'],
+        score=row['score'],
+        pub_date=row['pub_date'],
+    )
+
+
+def build_comment(row):
+    return Comment(
+        id=row['id'],
+        review_id=row['review_id'],
+        text=row['text'],
+        author_id=row['author'],
+        pub_date=row['pub_date'],
+    )
+
+
+USERS = TableSpec(
+    'users', User, 'users.csv', 'пользователей', build_user,
+    ('username', 'email', 'role', 'bio', 'first_name', 'last_name',
+     'search_username', 'search_email', 'search_text'),
+    {},
+)
+CATEGORIES = TableSpec(
+    'category', Category, 'category.csv', 'категорий', build_category,
+    ('name', 'slug'), {},
+)
+GENRES = TableSpec(
+    'genre', Genre, 'genre.csv', 'жанров', build_genre,
+    ('name', 'slug'), {},
+)
+TITLES = TableSpec(
+    'titles', Title, 'titles.csv', 'произведений', build_title,
+    ('name', 'year', 'category', 'description', 'search_name'),
+    {'category_id': Category},
+)
+GENRE_TITLES = TableSpec(
+    'genre_title', GenreTitle, 'genre_title.csv',
+    'связей жанр-произведение', build_genre_title, None,
+    {'title_id': Title, 'genre_id': Genre},
+)
+REVIEWS = TableSpec(
+    'review', Review, 'review.csv', 'отзывов', build_review,
+    ('title', 'text', 'author', 'score', 'pub_date'),
+    {'title_id': Title, 'author_id': User},
+)
+COMMENTS = TableSpec(
+    'comments', Comment, 'comments.csv', 'комментариев', build_comment,
+    ('review', 'text', 'author', 'pub_date'),
+    {'review_id': Review, 'author_id': User},
+)
+TABLES = (
+    USERS, CATEGORIES, GENRES, TITLES, GENRE_TITLES, REVIEWS, COMMENTS
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8') as file:
+        yield from csv.DictReader(file)
+
+
+def fingerprint(row):
+    """Отпечаток содержимого строки CSV."""
+    content = '\x1f'.join(
+        f'{name}\x1e{value}' for name, value in sorted(
+            row.items(), key=lambda item: str(item[0])
+        )
+    )
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def row_key(obj):
+    """Ключ строки для отпечатков: id, а у связей - пара id."""
+    if isinstance(obj, GenreTitle):
+        return f'{int(obj.title_id)}:{int(obj.genre_id)}'
+    return str(obj.pk)
+
+
+class TableStats:
+    """Итоги импорта одной таблицы."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+
+    @property
+    def written(self):
+        return self.inserted + self.updated
+
+
+def apply_user_changes(users):
+    """Отозвать токены при смене роли, сбросить ETag при смене username."""
+    old = {
+        pk: (role, username) for pk, role, username in User.objects.filter(
+            pk__in=[user.pk for user in users]
+        ).values_list('pk', 'role', 'username')
+    }
+    User.objects.filter(pk__in=[
+        user.pk for user in users if old[user.pk][0] != user.role
+    ]).update(token_version=F('token_version') + 1)
+    renamed = [user.pk for user in users if old[user.pk][1] != user.username]
+    if renamed:
+        bump_author_versions(renamed)
+
+
+class ImportCancelled(Exception):
+    """Импорт остановлен из-за ошибки в другом потоке."""
+
+
+def import_order(specs):
+    """Упорядочить таблицы так, чтобы каждая шла после тех, на кого ссылается.
+
+    Зависимости - это граф по ``references``: пользователи, категории
+    и жанры ни от кого не зависят, произведения - от категорий, отзывы -
+    от произведений и пользователей, комментарии - от отзывов.
+    """
+    models = {spec.model for spec in specs}
+    order = []
+    pending = list(specs)
+    while pending:
+        done = {spec.model for spec in order}
+        ready = [
+            spec for spec in pending
+            if all(
+                model in done or model not in models or model is spec.model
+                for model in spec.references.values()
+            )
+        ]
+        if not ready:
+            raise ValueError('Циклическая зависимость таблиц импорта.')
+        order.extend(ready)
+        pending = [spec for spec in pending if spec not in ready]
+    return order
+
+
+class CsvImporter:
+    """Импорт таблиц из каталога с CSV-файлами.
+
+    ``run()`` разбирает и проверяет независимые таблицы параллельно в
+    пуле потоков, а пишет в базу только вызывающий поток - по таблицам в
+    порядке зависимостей. Таблица проверяется, как только проверены
+    таблицы, на которые она ссылается: их id уже известны, записывать их
+    для этого не нужно. Между разбором и записью - очереди на несколько
+    пачек. Всё время импорта в памяти остаются только множества id
+    таблиц и id произведений, которые пересчитывает ``finish()``.
+    """
+
+    def __init__(self, data_dir, batch_size=None, warn=None, workers=None,
+                 paths=None, incremental=False):
+        self.data_dir = data_dir
+        self.incremental = incremental
+        # Пути к файлам отдельных шагов: {имя шага: путь}.
+        self.paths = paths or {}
+        self.batch_size = batch_size or settings.CSV_IMPORT_BATCH_SIZE
+        self.workers = workers or settings.CSV_IMPORT_WORKERS
+        self.warn = warn or (lambda message: None)
+        # Метка отпечатков строк, встреченных этим импортом.
+        self.run_id = uuid.uuid4().hex
+        self._ids = {}
+        self.stats = {}
+        self.accepted = defaultdict(set)
+        # Ключи строк с битыми ссылками: их прежние копии не удаляются.
+        self.skipped = defaultdict(set)
+        # Записанные модели и произведения, чьи рейтинги и версии
+        # пересчитываются в finish().
+        self.written_models = set()
+        self.titles = set()
+        self.cancelled = threading.Event()
+        self.failed = threading.Event()
+        self.errors = []
+
+    def known_ids(self, model):
+        """Множество id таблицы; загружается из базы один раз."""
+        if model not in self._ids:
+            self._ids[model] = set(
+                model.objects.values_list('pk', flat=True).iterator()
+            )
+        return self._ids[model]
+
+    def path(self, spec):
+        return self.paths.get(spec.name) or os.path.join(
+            self.data_dir, spec.file_name
+        )
+
+    def run(self, specs=TABLES):
+        """Импортировать таблицы, выдавая (spec, TableStats) после записи."""
+        order = import_order(specs)
+        # Всё нужное загружается заранее: потоки разбора к базе
+        # не обращаются.
+        for spec in order:
+            for model in (spec.model, *spec.references.values()):
+                self.known_ids(model)
+                self.accepted.setdefault(model, set())
+            if os.path.exists(self.path(spec)):
+                self.stats[spec.name] = TableStats()
+        validated = {spec.model: threading.Event() for spec in order}
+        queues = {
+            spec.model: queue.Queue(maxsize=QUEUE_BATCHES) for spec in order
+        }
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for spec in order:
+                    pool.submit(
+                        self.validate_table, spec,
+                        queues[spec.model], validated,
+                    )
+                for spec in order:
+                    yield spec, self.write_table(spec, queues[spec.model])
+            finally:
+                self.cancelled.set()
+
+    def validate_table(self, spec, batches, validated):
+        """Разобрать и проверить таблицу в потоке пула."""
+        try:
+            for model in spec.references.values():
+                if model in validated and model is not spec.model:
+                    self.wait(validated[model])
+            path = self.path(spec)
+            if not os.path.exists(path):
+                self.put(batches, MISSING)
+                return
+            objects = self.build_objects(spec, read_rows(path), path)
+            for batch in batched(objects, self.batch_size):
+                self.put(batches, batch)
+            self.put(batches, DONE)
+        except Exception as error:
+            if not isinstance(error, ImportCancelled):
+                self.errors.append(error)
+                self.failed.set()
+            # Писатель поднимет первую настоящую ошибку.
+            try:
+                self.put(batches, error)
+            except ImportCancelled:
+                pass
+        finally:
+            validated[spec.model].set()
+
+    def write_table(self, spec, batches):
+        while True:
+            batch = batches.get()
+            if batch is MISSING:
+                return None
+            if batch is DONE:
+                return self.stats[spec.name]
+            if isinstance(batch, Exception):
+                raise self.errors[0] if self.errors else batch
+            self.write_batch(spec, batch)
+
+    def wait(self, event):
+        while not event.wait(POLL_INTERVAL):
+            if self.cancelled.is_set():
+                raise ImportCancelled
+        if self.failed.is_set():
+            raise ImportCancelled
+
+    def put(self, batches, item):
+        while not self.cancelled.is_set():
+            try:
+                batches.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        raise ImportCancelled
+
+    def build_objects(self, spec, rows, path):
+        """Превратить строки в объекты, пропуская битые внешние ключи."""
+        accepted = self.accepted[spec.model]
+        self.stats.setdefault(spec.name, TableStats())
+        for row in rows:
+            obj = spec.build(row)
+            if obj.pk is not None:
+                obj.pk = int(obj.pk)
+            key = row_key(obj)
+            if not self.check_references(spec, obj, path):
+                self.skipped[spec.name].add(key)
+                continue
+            if obj.pk is not None:
+                accepted.add(obj.pk)
+            obj.import_fingerprint = (key, fingerprint(row))
+            yield obj
+
+    def check_references(self, spec, obj, path):
+        for attname, model in spec.references.items():
+            value = int(getattr(obj, attname))
+            if (value not in self.known_ids(model)
+                    and value not in self.accepted[model]):
+                self.warn(
+                    f'{path}: строка {self.describe(obj)} пропущена, '
+                    f'нет {attname}={value}.'
+                )
+                return False
+            setattr(obj, attname, value)
+        return True
+
+    @staticmethod
+    def describe(obj):
+        if isinstance(obj, GenreTitle):
+            return f'title_id={obj.title_id} genre_id={obj.genre_id}'
+        return f'id={obj.pk}'
+
+    def write_batch(self, spec, batch):
+        # Повтор ключа внутри пачки: остаётся последняя строка.
+        batch = list({
+            obj.import_fingerprint[0]: obj for obj in batch
+        }.values())
+        with transaction.atomic():
+            unchanged = self.unchanged_keys(spec, batch)
+            fresh = [
+                obj for obj in batch
+                if obj.import_fingerprint[0] not in unchanged
+            ]
+            if spec.fields is None:
+                # Связи сверяются с базой и так: удалённые в обход
+                # импорта вставляются заново. Для кешей API изменение
+                # жанров - это изменение произведения.
+                ids = {Title: self.write_links(spec, batch)}
+            else:
+                ids = {spec.model: self.write_rows(spec, fresh)}
+                self.stats[spec.name].unchanged += len(unchanged)
+            self.save_fingerprints(spec, fresh)
+            ImportFingerprint.objects.filter(
+                table=spec.name, key__in=unchanged
+            ).update(run=self.run_id)
+        if any(ids.values()):
+            data_imported.send(sender=type(self), ids=ids)
+
+    def unchanged_keys(self, spec, batch):
+        """Ключи строк пачки, не изменившихся с прошлого импорта."""
+        if not self.incremental:
+            return set()
+        old = dict(ImportFingerprint.objects.filter(
+            table=spec.name,
+            key__in=[obj.import_fingerprint[0] for obj in batch],
+        ).values_list('key', 'digest'))
+        # Строку, удалённую из базы в обход импорта, надо создать заново.
+        known = self.known_ids(spec.model) if spec.fields else None
+        return {
+            key for key, digest in (obj.import_fingerprint for obj in batch)
+            if old.get(key) == digest
+            and (known is None or int(key) in known)
+        }
+
+    def write_rows(self, spec, batch):
+        """Записать строки пачки; вернуть множество их id."""
+        model = spec.model
+        known = self.known_ids(model)
+        new = [obj for obj in batch if obj.pk not in known]
+        existing = [obj for obj in batch if obj.pk in known]
+        # auto_now_add заменяет дату при вставке - вернём дату из файла.
+        kept_dates = [
+            (obj, obj.pub_date) for obj in new if hasattr(obj, 'pub_date')
+        ]
+        if existing and model is User:
+            apply_user_changes(existing)
+        old_parents = self.old_parents(model, existing)
+        model.objects.bulk_create(new)
+        if kept_dates:
+            for obj, pub_date in kept_dates:
+                obj.pub_date = pub_date
+            model.objects.bulk_update(new, ['pub_date'])
+        model.objects.bulk_update(existing, spec.fields)
+        self.mark_changed(model, batch, existing, old_parents)
+        known.update(obj.pk for obj in new)
+        if batch:
+            self.written_models.add(model)
+        stats = self.stats[spec.name]
+        stats.inserted += len(new)
+        stats.updated += len(existing)
+        return {obj.pk for obj in batch}
+
+    @staticmethod
+    def old_parents(model, existing):
+        """Текущие родители существующих отзывов или комментариев.
+
+        Строка могла перейти к другому родителю - прежний тоже меняется.
+        """
+        parent_field = PARENT_FIELDS.get(model)
+        if not existing or parent_field is None:
+            return set()
+        return set(model.objects.filter(
+            pk__in=[obj.pk for obj in existing]
+        ).values_list(parent_field, flat=True))
+
+    def mark_changed(self, model, batch, existing, old_parents):
+        """Поднять версии и запомнить произведения для finish()."""
+        # Новые категории и жанры ещё ни к чему не привязаны.
+        existing_ids = [obj.pk for obj in existing]
+        if model is Category and existing_ids:
+            bump_versions(Title.objects.filter(category_id__in=existing_ids))
+        elif model is Genre and existing_ids:
+            bump_versions(Title.objects.filter(genre__in=existing_ids))
+        elif model is Comment and batch:
+            bump_versions(Review.objects.filter(
+                pk__in={obj.review_id for obj in batch} | old_parents
+            ))
+        elif model is Review:
+            self.titles.update(obj.title_id for obj in batch)
+            self.titles.update(old_parents)
+        elif model is Title:
+            self.titles.update(obj.pk for obj in batch)
+
+    def write_links(self, spec, batch):
+        """Вставить связи одним запросом, пропуская уже существующие.
+
+        Вернуть id произведений, у которых появились связи.
+        """
+        existing = set(spec.model.objects.filter(
+            title_id__in={link.title_id for link in batch}
+        ).values_list('title_id', 'genre_id'))
+        new = {
+            (link.title_id, link.genre_id): link for link in batch
+            if (link.title_id, link.genre_id) not in existing
+        }
+        if new:
+            spec.model.objects.bulk_create(
+                new.values(), ignore_conflicts=True
+            )
+        titles = {title_id for title_id, _ in new}
+        self.titles.update(titles)
+        stats = self.stats[spec.name]
+        stats.inserted += len(new)
+        stats.unchanged += len(batch) - len(new)
+        return titles
+
+    def save_fingerprints(self, spec, batch):
+        prints = dict(obj.import_fingerprint for obj in batch)
+        ImportFingerprint.objects.filter(
+            table=spec.name, key__in=list(prints)
+        ).delete()
+        ImportFingerprint.objects.bulk_create([
+            ImportFingerprint(
+                table=spec.name, key=key, digest=digest, run=self.run_id
+            )
+            for key, digest in prints.items()
+        ])
+
+    def delete_missing(self, specs=TABLES):
+        """Удалить строки прошлого импорта, которых нет в новых файлах.
+
+        Строки, созданные не импортом, и таблицы, чей файл не найден, не
+        трогаются. Удаление идёт от зависимых таблиц к главным, обычным
+        delete(): каскады и сигналы моделей срабатывают как обычно.
+        """
+        for spec in reversed(import_order(specs)):
+            stats = self.stats.get(spec.name)
+            if stats is None:
+                continue
+            # Строки этого импорта помечены run_id, остальные отпечатки -
+            # от строк, пропавших из файла. Выбираются пачками по ключу.
+            missing = ImportFingerprint.objects.filter(
+                table=spec.name
+            ).exclude(run=self.run_id).order_by('key')
+            last_key = ''
+            while keys := list(missing.filter(
+                key__gt=last_key
+            ).values_list('key', flat=True)[:self.batch_size]):
+                last_key = keys[-1]
+                keys = [
+                    key for key in keys if key not in self.skipped[spec.name]
+                ]
+                with transaction.atomic():
+                    stats.deleted += self.delete_rows(spec, keys)
+                    ImportFingerprint.objects.filter(
+                        table=spec.name, key__in=keys
+                    ).delete()
+
+    def delete_rows(self, spec, keys):
+        if spec.fields is None:
+            pairs = {tuple(map(int, key.split(':'))) for key in keys}
+            links = {
+                pk: title_id
+                for pk, title_id, genre_id in spec.model.objects.filter(
+                    title_id__in={title_id for title_id, _ in pairs}
+                ).values_list('pk', 'title_id', 'genre_id')
+                if (title_id, genre_id) in pairs
+            }
+            self.titles.update(links.values())
+            return spec.model.objects.filter(pk__in=list(links)).delete()[0]
+        _, deleted = spec.model.objects.filter(
+            pk__in=[int(key) for key in keys]
+        ).delete()
+        return deleted.get(spec.model._meta.label, 0)
+
+    def finish(self):
+        """Пересчитать производные данные и сбросить кеши API."""
+        for ids in batched(sorted(self.titles), self.batch_size):
+            rebuild_ratings(Title.objects.filter(pk__in=ids))
+            bump_versions(Title.objects.filter(pk__in=ids))
+        self.reset_sequences()
+        if self.titles:
+            data_imported.send(sender=type(self), ids={Title: self.titles})
+
+    def reset_sequences(self):
+        """Сдвинуть счётчики id за импортированные значения (не SQLite)."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(self.written_models)
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
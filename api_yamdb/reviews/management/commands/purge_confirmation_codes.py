@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.codes import purge_codes
+
+
+class Command(BaseCommand):
+    help = 'Удаление просроченных и сгоревших кодов подтверждения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.CONFIRMATION_CODE_PURGE_BATCH_SIZE,
+            help='Сколько кодов удалять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_codes(options['batch_size'])
+        self.stdout.write(f'Удалено кодов: {deleted}.')
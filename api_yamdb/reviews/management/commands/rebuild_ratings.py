@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.models import Title
+from reviews.ratings import find_stale_ratings, rebuild_ratings
+from reviews.signals import data_imported
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт и проверка сохранённых рейтингов произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить рейтинги, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale_ids = find_stale_ratings()
+            if stale_ids:
+                raise CommandError(
+                    f'Неверный рейтинг у {len(stale_ids)} произведений: '
+                    f'{", ".join(map(str, stale_ids[:20]))}'
+                )
+            self.stdout.write(self.style.SUCCESS('Все рейтинги верны.'))
+            return
+
+        fixed_ids = rebuild_ratings()
+        if fixed_ids:
+            # Рейтинг исправлен через update() - кеши API сбрасываются
+            # так же, как после импорта.
+            data_imported.send(sender=type(self), ids={Title: set(fixed_ids)})
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан, исправлено произведений: {len(fixed_ids)}.'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.emails import send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем из очереди (outbox)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Сколько писем отправлять через одно соединение.',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а проверять очередь снова и снова.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками очереди в режиме --loop, сек.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending_emails(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, с ошибкой: {failed}.'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
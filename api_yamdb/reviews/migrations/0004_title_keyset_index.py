@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-year', 'name', 'id'], name='title_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+from reviews.search import normalize_search
+
+
+def fill_search_names(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = list(Title.objects.only('id', 'name'))
+    for title in titles:
+        title.search_name = normalize_search(title.name)[:256]
+    Title.objects.bulk_update(titles, ['search_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+    ]
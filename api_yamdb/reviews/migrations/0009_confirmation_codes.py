@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:39
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def move_codes(apps, schema_editor):
+    User = apps.get_model('reviews', 'User')
+    ConfirmationCode = apps.get_model('reviews', 'ConfirmationCode')
+    expires_at = timezone.now() + timedelta(
+        seconds=settings.CONFIRMATION_CODE_TTL
+    )
+    codes = User.objects.exclude(confirmation_code='').values_list(
+        'pk', 'confirmation_code'
+    )
+    ConfirmationCode.objects.bulk_create([
+        ConfirmationCode(user_id=pk, code=code, expires_at=expires_at)
+        for pk, code in codes
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmationCode',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='confirmation', serialize=False, to='reviews.user', verbose_name='Пользователь')),
+                ('code', models.CharField(max_length=5, verbose_name='Код')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток')),
+            ],
+            options={
+                'verbose_name': 'Код подтверждения',
+                'verbose_name_plural': 'Коды подтверждения',
+            },
+        ),
+        migrations.RunPython(move_codes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='confirmation_code',
+        ),
+    ]
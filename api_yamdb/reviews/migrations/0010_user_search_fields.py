@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:43
+
+from django.db import migrations, models
+
+from reviews.search import normalize_search
+
+
+def fill_user_search_fields(apps, schema_editor):
+    User = apps.get_model('reviews', 'User')
+    users = list(User.objects.only(
+        'id', 'username', 'email', 'first_name', 'last_name'
+    ))
+    for user in users:
+        user.search_username = normalize_search(user.username)
+        user.search_email = normalize_search(user.email)
+        user.search_text = normalize_search(' '.join((
+            user.username, user.email, user.first_name, user.last_name
+        )))
+    User.objects.bulk_update(
+        users, ['search_username', 'search_email', 'search_text'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_confirmation_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_email',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254, verbose_name='Email для поиска'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.TextField(default='', editable=False, verbose_name='Текст для поиска'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='search_username',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150, verbose_name='Логин для поиска'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('user', 'Пользователь'), ('moderator', 'Модератор'), ('admin', 'Администратор')], db_index=True, default='user', max_length=9, verbose_name='Роль'),
+        ),
+        migrations.RunPython(
+            fill_user_search_fields, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_user_search_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=32, verbose_name='Шаг импорта')),
+                ('key', models.CharField(max_length=64, verbose_name='Ключ строки')),
+                ('digest', models.CharField(max_length=32, verbose_name='Отпечаток')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток импорта',
+                'verbose_name_plural': 'Отпечатки импорта',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importfingerprint',
+            constraint=models.UniqueConstraint(fields=('table', 'key'), name='unique_import_fingerprint'),
+        ),
+    ]
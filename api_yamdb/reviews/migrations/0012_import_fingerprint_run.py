@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_import_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importfingerprint',
+            name='run',
+            field=models.CharField(default='', max_length=32, verbose_name='Импорт, в котором строка встречалась последней'),
+        ),
+    ]
@@ -4,13 +4,16 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from reviews.constants import COMMENT_SYMBOLS, MIN_RATING, MAX_RATING
+from reviews.search import normalize_search
 from reviews.validators import check_username
 
 MAX_USERNAME_LENGTH = 150
 MAX_EMAIL_LENGTH = 254
 MAX_NAME_LENGTH = 100
+MAX_TITLE_NAME_LENGTH = 256
 
 USER = 'user'
 MODERATOR = 'moderator'
@@ -22,7 +25,23 @@ ROLE_CHOICES = [
 ]
 
 
-class User(AbstractUser):
+class UserRolesMixin:
+    """Проверки ролей, общие для модели и пользователя из токена."""
+
+    @property
+    def is_admin(self):
+        return self.is_staff or self.role == ADMIN
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR
+
+    @property
+    def is_user(self):
+        return self.role == USER
+
+
+class User(UserRolesMixin, AbstractUser):
     username = models.CharField(
         verbose_name='Логин',
         max_length=MAX_USERNAME_LENGTH,
@@ -41,6 +60,7 @@ class User(AbstractUser):
         max_length=max(len(role) for role, _ in ROLE_CHOICES),
         choices=ROLE_CHOICES,
         default=USER,
+        db_index=True,
     )
 
     bio = models.TextField(
@@ -60,30 +80,103 @@ class User(AbstractUser):
         blank=True,
     )
 
-    confirmation_code = models.CharField(
-        max_length=settings.CONFIRMATION_CODE_LENGTH,
-        blank=True,
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов',
+        default=0,
+        editable=False,
     )
 
-    @property
-    def is_admin(self):
-        return self.is_staff or self.role == ADMIN
-
-    @property
-    def is_moderator(self):
-        return self.role == MODERATOR
+    # Нормализованные копии для поиска (см. reviews.search.search_users).
+    search_username = models.CharField(
+        max_length=MAX_USERNAME_LENGTH,
+        verbose_name='Логин для поиска',
+        db_index=True,
+        editable=False,
+        default='',
+    )
+    search_email = models.CharField(
+        max_length=MAX_EMAIL_LENGTH,
+        verbose_name='Email для поиска',
+        db_index=True,
+        editable=False,
+        default='',
+    )
+    search_text = models.TextField(
+        verbose_name='Текст для поиска',
+        editable=False,
+        default='',
+    )
 
-    @property
-    def is_user(self):
-        return self.role == USER
+    search_source_fields = ('username', 'email', 'first_name', 'last_name')
+
+    # Поля, которые попадают в токен: их изменение отзывает старые токены.
+    token_claim_fields = ('role', 'is_staff', 'is_active')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_claims = user.get_token_claims()
+        user._loaded_username = user.__dict__.get('username')
+        return user
+
+    def get_token_claims(self):
+        return tuple(
+            self.__dict__.get(name) for name in self.token_claim_fields
+        )
+
+    def fill_search_fields(self):
+        self.search_username = normalize_search(self.username)
+        self.search_email = normalize_search(self.email)
+        self.search_text = normalize_search(' '.join(
+            getattr(self, name) or '' for name in self.search_source_fields
+        ))
+
+    def save(self, *args, **kwargs):
+        self.fill_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is not None
+                and set(update_fields) & set(self.search_source_fields)):
+            kwargs['update_fields'] = update_fields = {
+                *update_fields, 'search_username', 'search_email',
+                'search_text',
+            }
+        loaded_claims = getattr(self, '_loaded_claims', None)
+        if (not self._state.adding and loaded_claims is not None
+                and loaded_claims != self.get_token_claims()):
+            self.token_version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_claims = self.get_token_claims()
 
     def __str__(self):
         return (f'{self.username=} {self.email=} {self.role=}'
-                f'{self.bio[:20]=} {self.confirmation_code=}'
+                f'{self.bio[:20]=} '
                 f'{self.first_name} {self.last_name}'
                 )
 
 
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при сохранении существующей записи.
+
+    Поля из ``counter_fields`` меняются только атомарными ``UPDATE ... F()``
+    (см. ``reviews.signals``), поэтому обычный ``save()`` не должен
+    затирать их значениями, прочитанными раньше.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+                and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
 class BaseCategoryGenre(models.Model):
     """Базовая модель для Category и Genre."""
     name = models.CharField(
@@ -124,7 +217,7 @@ def actual_year():
     return dt.today().year
 
 
-class Title(models.Model):
+class Title(CounterFieldsMixin, models.Model):
     """Модель произведения."""
 
     category = models.ForeignKey(
@@ -141,9 +234,16 @@ class Title(models.Model):
         related_name='titles',
     )
     name = models.CharField(
-        max_length=256,
+        max_length=MAX_TITLE_NAME_LENGTH,
         verbose_name='Название'
     )
+    search_name = models.CharField(
+        max_length=MAX_TITLE_NAME_LENGTH,
+        verbose_name='Название для поиска',
+        db_index=True,
+        editable=False,
+        default='',
+    )
     year = models.SmallIntegerField(
         verbose_name='Год выпуска',
         validators=[
@@ -155,16 +255,56 @@ class Title(models.Model):
         null=True,
         blank=True
     )
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('rating_sum', 'rating_count', 'version')
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         default_related_name = 'titles'
         ordering = ('-year', 'name')
+        indexes = [
+            models.Index(
+                fields=['-year', 'name', 'id'], name='title_keyset_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name[:20]=}'
 
+    def fill_search_name(self):
+        self.search_name = normalize_search(
+            self.name
+        )[:MAX_TITLE_NAME_LENGTH]
+
+    def save(self, *args, **kwargs):
+        self.fill_search_name()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum // self.rating_count
+
 
 class MessageData(models.Model):
     """Базовая модель для Review и Comment."""
@@ -194,7 +334,7 @@ class MessageData(models.Model):
                 )
 
 
-class Review(MessageData):
+class Review(CounterFieldsMixin, MessageData):
     """Модель отзывы."""
 
     title = models.ForeignKey(
@@ -208,6 +348,13 @@ class Review(MessageData):
             MinValueValidator(MIN_RATING), MaxValueValidator(MAX_RATING)
         ]
     )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия комментариев',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('version',)
 
     class Meta(MessageData.Meta):
         verbose_name = 'Отзыв'
@@ -222,6 +369,14 @@ class Review(MessageData):
     def __str__(self):
         return f'{super().__str__()} title={self.title.name[:20]}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        # Запоминаем загруженное произведение, чтобы при переносе отзыва
+        # пересчитать рейтинг и у прежнего.
+        review._loaded_title_id = review.__dict__.get('title_id')
+        return review
+
 
 class Comment(MessageData):
     """Модель комментарии."""
@@ -242,3 +397,127 @@ class Comment(MessageData):
                     f'{self.review.author=} '
                     f'{self.review.title.name=}'
                     )
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (outbox)."""
+
+    recipient = models.EmailField(
+        verbose_name='Получатель',
+        max_length=MAX_EMAIL_LENGTH,
+    )
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=256,
+    )
+    body = models.TextField(
+        verbose_name='Текст',
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создано',
+        auto_now_add=True,
+    )
+    send_after = models.DateTimeField(
+        verbose_name='Отправить после',
+        default=timezone.now,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0,
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Отправлено',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('send_after',)
+        indexes = [
+            models.Index(
+                fields=['sent_at', 'send_after'], name='outbox_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient=} {self.subject[:20]=} {self.sent_at=}'
+
+
+class ConfirmationCode(models.Model):
+    """Код подтверждения, выданный при регистрации.
+
+    Хранится отдельно от пользователя: выдача и неудачные попытки
+    входа пишут в эту маленькую таблицу, а не в ``reviews_user``.
+    """
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='confirmation',
+    )
+    code = models.CharField(
+        verbose_name='Код',
+        max_length=settings.CONFIRMATION_CODE_LENGTH,
+    )
+    expires_at = models.DateTimeField(
+        verbose_name='Действует до',
+        db_index=True,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Неудачных попыток',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return f'{self.user_id=} {self.expires_at=} {self.attempts=}'
+
+
+class ImportFingerprint(models.Model):
+    """Отпечаток строки CSV, загруженной командой import_csv.
+
+    По отпечаткам повторный импорт пропускает неизменённые строки и
+    находит строки, исчезнувшие из файла.
+    """
+
+    table = models.CharField(
+        verbose_name='Шаг импорта',
+        max_length=32,
+    )
+    key = models.CharField(
+        verbose_name='Ключ строки',
+        max_length=64,
+    )
+    digest = models.CharField(
+        verbose_name='Отпечаток',
+        max_length=32,
+    )
+    run = models.CharField(
+        verbose_name='Импорт, в котором строка встречалась последней',
+        max_length=32,
+        default='',
+    )
+
+    class Meta:
+        verbose_name = 'Отпечаток импорта'
+        verbose_name_plural = 'Отпечатки импорта'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['table', 'key'],
+                name='unique_import_fingerprint'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.table=} {self.key=}'
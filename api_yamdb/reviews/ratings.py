@@ -0,0 +1,72 @@
+"""Поддержка денормализованного рейтинга произведений.
+
+Рейтинг хранится в полях ``Title.rating_sum`` и ``Title.rating_count``,
+поэтому чтение произведений обходится без агрегации по таблице отзывов.
+Новый отзыв прибавляет свою оценку атомарно (через ``F()``), а при
+изменении и удалении отзыва рейтинг произведения пересчитывается одним
+UPDATE по его отзывам: разница с оценкой, загруженной в память, могла
+устареть из-за параллельной правки того же отзыва.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from reviews.models import Review, Title
+
+
+def change_title_rating(title_id, score_delta, count_delta):
+    """Сдвинуть сумму и количество оценок на дельты, поднять версию.
+
+    Версия растёт и при нулевых дельтах: изменился текст отзыва.
+    """
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        version=F('version') + 1,
+    )
+
+
+def _aggregate(function):
+    """Подзапрос, считающий агрегат оценок для внешнего произведения."""
+    return Coalesce(
+        Subquery(
+            Review.objects.filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+            .annotate(value=function)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def find_stale_ratings(titles=None):
+    """Вернуть id произведений, у которых сохранённый рейтинг неверен."""
+    if titles is None:
+        titles = Title.objects.all()
+    return list(
+        titles.annotate(
+            actual_sum=_aggregate(Sum('score')),
+            actual_count=_aggregate(Count('id')),
+        ).exclude(
+            rating_sum=F('actual_sum'),
+            rating_count=F('actual_count'),
+        ).order_by().values_list('pk', flat=True)
+    )
+
+
+def recount_ratings(titles):
+    """Пересчитать рейтинг произведений по их отзывам и поднять версию."""
+    titles.update(
+        rating_sum=_aggregate(Sum('score')),
+        rating_count=_aggregate(Count('id')),
+        version=F('version') + 1,
+    )
+
+
+def rebuild_ratings(titles=None):
+    """Пересчитать рейтинг с нуля; вернуть id исправленных произведений."""
+    stale_ids = find_stale_ratings(titles)
+    if stale_ids:
+        recount_ratings(Title.objects.filter(pk__in=stale_ids))
+    return stale_ids
@@ -0,0 +1,137 @@
+"""Поиск произведений по названию и пользователей.
+
+Названия хранятся в нормализованном виде в ``Title.search_name``
+(casefold и замена «ё» на «е»), поэтому регистр не важен и для
+кириллицы. На SQLite по этому столбцу строится FTS5-таблица с
+триграммным токенизатором: поиск подстроки идёт по индексу, а не
+полным просмотром таблицы. На других СУБД и для запросов короче
+трёх символов используется обычный ``contains`` по столбцу.
+
+Пользователи ищутся по префиксу нормализованных логина и email -
+диапазоном, который обслуживают обычные индексы, - и точно по роли.
+"""
+from django.db import OperationalError, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'reviews_title_search'
+TITLE_TABLE = 'reviews_title'
+MIN_TRIGRAM_LENGTH = 3
+
+SEARCH_TRIGGERS = {
+    f'{SEARCH_TABLE}_ai': (
+        f'AFTER INSERT ON {TITLE_TABLE} BEGIN '
+        f'INSERT INTO {SEARCH_TABLE}(rowid, search_name) '
+        'VALUES (new.id, new.search_name); END'
+    ),
+    f'{SEARCH_TABLE}_ad': (
+        f'AFTER DELETE ON {TITLE_TABLE} BEGIN '
+        f'INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, search_name) '
+        "VALUES ('delete', old.id, old.search_name); END"
+    ),
+    f'{SEARCH_TABLE}_au': (
+        f'AFTER UPDATE OF search_name ON {TITLE_TABLE} BEGIN '
+        f'INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, search_name) '
+        "VALUES ('delete', old.id, old.search_name); "
+        f'INSERT INTO {SEARCH_TABLE}(rowid, search_name) '
+        'VALUES (new.id, new.search_name); END'
+    ),
+}
+
+# Больше любого символа: "prefix <= x < prefix + PREFIX_END".
+PREFIX_END = '\U0010ffff'
+
+_available = {}
+
+
+def normalize_search(text):
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def ensure_title_search_index(using='default', **kwargs):
+    """Создать FTS-таблицу и триггеры, если их нет (после migrate).
+
+    Триггеры пересоздаются при каждом запуске: SQLite-миграции Django
+    пересобирают таблицу произведений и теряют навешанные на неё триггеры.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if TITLE_TABLE not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            'AND tbl_name = %s', [TITLE_TABLE]
+        )
+        existing = {name for name, in cursor.fetchall()}
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+                f"USING fts5(search_name, content='{TITLE_TABLE}', "
+                "content_rowid='id', tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite без FTS5 или триграммного токенизатора (< 3.34).
+            return
+        missing = set(SEARCH_TRIGGERS) - existing
+        for name in missing:
+            cursor.execute(
+                f'CREATE TRIGGER {name} {SEARCH_TRIGGERS[name]}'
+            )
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                "VALUES ('rebuild')"
+            )
+    _available.pop(connection.settings_dict['NAME'], None)
+
+
+def has_search_index(connection):
+    name = connection.settings_dict['NAME']
+    if name not in _available:
+        _available[name] = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available[name]
+
+
+def search_titles(queryset, query):
+    """Отфильтровать произведения, в названии которых есть ``query``."""
+    query = normalize_search(query)
+    connection = connections[queryset.db]
+    if len(query) >= MIN_TRIGRAM_LENGTH and has_search_index(connection):
+        phrase = '"{}"'.format(query.replace('"', '""'))
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s', [phrase]
+        ))
+    return queryset.filter(search_name__contains=query)
+
+
+def prefix_q(field, prefix):
+    """Условие «начинается с» в виде диапазона по индексу столбца."""
+    return Q(**{
+        f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END
+    })
+
+
+def search_users(queryset, query, full=False):
+    """Отобрать пользователей, подходящих под каждое слово запроса.
+
+    Слово совпадает с началом логина или email либо с ролью целиком.
+    При ``full`` слово ищется в любом месте логина, email, имени и
+    фамилии по общему столбцу ``search_text`` - это полный просмотр.
+    """
+    for term in normalize_search(query).split():
+        if full:
+            condition = Q(search_text__contains=term)
+        else:
+            condition = (
+                prefix_q('search_username', term)
+                | prefix_q('search_email', term)
+                | Q(role=term)
+            )
+        queryset = queryset.filter(condition)
+    return queryset
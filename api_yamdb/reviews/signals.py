@@ -0,0 +1,89 @@
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import Signal, receiver
+
+from reviews.models import (
+    Category, Comment, Genre, Review, Title, User
+)
+from reviews.ratings import change_title_rating, recount_ratings
+
+# Массовый импорт (reviews.importer) пишет в обход save() и сигналов
+# моделей. Сигнал отправляется после каждой записанной пачки и в конце
+# импорта; аргумент ids - словарь {модель: множество записанных id}.
+# Его же отправляет команда rebuild_ratings, исправив рейтинги.
+data_imported = Signal()
+
+
+def bump_versions(queryset):
+    queryset.update(version=F('version') + 1)
+
+
+def bump_author_versions(user_ids):
+    """Обновить версии списков, где показан username этих авторов."""
+    bump_versions(Title.objects.filter(reviews__author__in=user_ids))
+    bump_versions(Review.objects.filter(comments__author__in=user_ids))
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    if created:
+        change_title_rating(instance.title_id, int(instance.score), 1)
+    else:
+        old_title_id = getattr(instance, '_loaded_title_id', None)
+        recount_ratings(Title.objects.filter(
+            pk__in={instance.title_id, old_title_id} - {None}
+        ))
+    instance._loaded_title_id = instance.title_id
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    recount_ratings(Title.objects.filter(pk=instance.title_id))
+
+
+@receiver(post_save, sender=Title)
+def bump_title_version(sender, instance, created, **kwargs):
+    if not created:
+        bump_versions(Title.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_version_on_genres(sender, instance, action, reverse,
+                                 pk_set, **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        bump_versions(Title.objects.filter(pk=instance.pk))
+    elif reverse and action in ('post_add', 'post_remove'):
+        bump_versions(Title.objects.filter(pk__in=pk_set))
+    elif reverse and action == 'pre_clear':
+        bump_versions(Title.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def bump_category_titles_version(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        bump_versions(Title.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def bump_genre_titles_version(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        bump_versions(Title.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_review_version(sender, instance, **kwargs):
+    bump_versions(Review.objects.filter(pk=instance.review_id))
+
+
+@receiver(post_save, sender=User)
+def bump_versions_on_rename(sender, instance, created, **kwargs):
+    loaded_username = getattr(instance, '_loaded_username', None)
+    if (not created and loaded_username is not None
+            and loaded_username != instance.username):
+        bump_author_versions([instance.pk])
+    instance._loaded_username = instance.username
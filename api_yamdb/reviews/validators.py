@@ -5,7 +5,7 @@ from django.core.exceptions import ValidationError
 
 
 def check_username(username):
-    if username == settings.FORBIDDEN_USERNAME:
+    if username in (settings.FORBIDDEN_USERNAME, settings.USERS_BULK_PATH):
         raise ValidationError(
             f"Имя '{username}' не разрешено."
         )
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_emails(settings):
+    # Тесты проверяют письма в mail.outbox сразу после запроса.
+    settings.EMAIL_OUTBOX_EAGER = True
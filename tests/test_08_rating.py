@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json()['rating']
+
+    def test_01_rating_follows_reviews(self, admin_client, user_client,
+                                       moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert self.get_rating(admin_client, title_id) is None, (
+            'Рейтинг произведения без отзывов должен быть равен `None`.'
+        )
+
+        review = create_single_review(
+            user_client, title_id, 'Отлично', 10
+        ).json()
+        create_single_review(moderator_client, title_id, 'Неплохо', 5)
+        assert self.get_rating(admin_client, title_id) == 7, (
+            'Рейтинг должен обновляться при создании отзыва.'
+        )
+
+        review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review['id']
+        )
+        user_client.patch(review_url, data={'score': 1})
+        assert self.get_rating(admin_client, title_id) == 3, (
+            'Рейтинг должен обновляться при изменении оценки в отзыве.'
+        )
+
+        user_client.delete(review_url)
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Рейтинг должен обновляться при удалении отзыва.'
+        )
+        call_command('rebuild_ratings', '--check')
+
+    def test_02_rebuild_ratings_command(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отлично', 8)
+        Title.objects.filter(pk=title_id).update(rating_sum=0, rating_count=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+        assert self.get_rating(admin_client, title_id) == 8
+
+    def test_03_concurrent_score_changes(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = create_single_review(
+            user_client, title_id, 'Отлично', 8
+        ).json()['id']
+        # Две правки одного отзыва, загруженного до любой из них.
+        first = Review.objects.get(pk=review_id)
+        second = Review.objects.get(pk=review_id)
+        first.score = 2
+        first.save()
+        second.score = 4
+        second.save()
+        assert self.get_rating(admin_client, title_id) == 4, (
+            'Параллельные правки отзыва не должны искажать рейтинг.'
+        )
+        call_command('rebuild_ratings', '--check')
+
+    def test_04_rebuild_resets_title_cache(self, client, admin_client,
+                                           user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отлично', 8)
+        Title.objects.filter(pk=title_id).update(rating_sum=3)
+        assert self.get_rating(client, title_id) == 3
+        call_command('rebuild_ratings')
+        assert self.get_rating(client, title_id) == 8, (
+            'После пересчёта рейтингов кеш произведений должен сбрасываться.'
+        )
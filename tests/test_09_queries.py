@@ -0,0 +1,72 @@
+import pytest
+
+from tests.utils import (
+    create_comments, create_single_review, create_titles
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryCount:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def create_many_titles(self, admin_client, count):
+        titles, categories, genres = create_titles(admin_client)
+        for number in range(count):
+            admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {number}',
+                'year': 2000,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[number % 2]['slug'],
+            })
+        return titles
+
+    def test_01_titles_list_queries(self, client, admin_client,
+                                    django_assert_num_queries):
+        self.create_many_titles(admin_client, 12)
+        # COUNT для пагинации, произведения с категориями, жанры.
+        with django_assert_num_queries(3):
+            response = client.get(self.TITLES_URL)
+        assert len(response.json()['results']) == 10
+        with django_assert_num_queries(3):
+            client.get(self.TITLES_URL, {'page': 2})
+
+    def test_02_title_detail_queries(self, client, admin_client, user_client,
+                                     django_assert_num_queries):
+        titles = self.create_many_titles(admin_client, 1)
+        create_single_review(user_client, titles[0]['id'], 'Текст', 7)
+        # Версия для ETag, произведение с категорией, жанры.
+        with django_assert_num_queries(3):
+            response = client.get(
+                self.TITLE_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id']
+                )
+            )
+        assert response.json()['rating'] == 7
+        assert len(response.json()['genre']) == 2
+
+    def test_03_reviews_and_comments_list_queries(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator, django_assert_num_queries
+    ):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client, user: user_client,
+            moderator: moderator_client
+        })
+        urls = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/',
+        )
+        for url in urls:
+            # Родитель, COUNT(*) и страница вместе с авторами.
+            with django_assert_num_queries(3):
+                response = client.get(url)
+            results = response.json()['results']
+            assert len(results) == 3
+            assert {item['author'] for item in results} == {
+                admin.username, user.username, moderator.username
+            }
+            with django_assert_num_queries(3):
+                client.get(url, {'fields': 'id,author'})
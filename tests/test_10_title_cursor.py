@@ -0,0 +1,58 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitleCursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def create_titles(self, admin_client, count):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        for number in range(count):
+            response = admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {number % 4}',
+                'year': 1990 + number % 3,
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug'],
+            })
+            assert response.status_code == HTTPStatus.CREATED
+
+    def test_01_cursor_walks_all_titles(self, client, admin_client,
+                                        django_assert_num_queries):
+        self.create_titles(admin_client, 25)
+        seen = []
+        url = f'{self.TITLES_URL}?cursor='
+        while url:
+            # Без COUNT(*): только произведения и их жанры.
+            with django_assert_num_queries(2):
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data
+            seen.extend(
+                (-title['year'], title['name'], title['id'])
+                for title in data['results']
+            )
+            url = data['next']
+        assert len(seen) == 25, (
+            'Курсорная пагинация должна вернуть каждое произведение '
+            'ровно один раз.'
+        )
+        assert seen == sorted(seen), (
+            'Курсорная пагинация должна сортировать по (-year, name, id).'
+        )
+
+    def test_02_invalid_cursor(self, client):
+        response = client.get(self.TITLES_URL, {'cursor': 'не курсор'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_03_page_number_by_default(self, client, admin_client):
+        self.create_titles(admin_client, 3)
+        data = client.get(self.TITLES_URL).json()
+        assert data['count'] == 3
+        assert 'previous' in data
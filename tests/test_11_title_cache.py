@@ -0,0 +1,65 @@
+import pytest
+from django.db import transaction
+
+from api.cache import get_titles_version
+from reviews.models import Review, Title, User
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def test_01_repeated_reads_are_cached(self, client, admin_client,
+                                          django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        detail_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        first_list = client.get(self.TITLES_URL, {'year': 1984}).json()
+        first_detail = client.get(detail_url).json()
+        with django_assert_num_queries(0):
+            assert client.get(
+                self.TITLES_URL, {'year': 1984}
+            ).json() == first_list
+        # Из базы читается только версия произведения для ETag.
+        with django_assert_num_queries(1):
+            assert client.get(detail_url).json() == first_detail
+
+    def test_02_writes_invalidate_cache(self, client, admin_client,
+                                        user_client):
+        titles, _, genres = create_titles(admin_client)
+        title_id = titles[0]['id']
+        detail_url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        assert client.get(detail_url).json()['rating'] is None
+
+        create_single_review(user_client, title_id, 'Текст', 9)
+        assert client.get(detail_url).json()['rating'] == 9, (
+            'Новый отзыв должен сбрасывать кеш произведений.'
+        )
+
+        admin_client.patch(detail_url, data={'genre': [genres[2]['slug']]})
+        assert client.get(detail_url).json()['genre'] == [genres[2]], (
+            'Изменение жанров произведения должно сбрасывать кеш.'
+        )
+
+        admin_client.delete(f'/api/v1/categories/{titles[0]["category"]}/')
+        assert client.get(detail_url).json()['category'] is None, (
+            'Удаление категории должно сбрасывать кеш произведений.'
+        )
+
+    def test_03_version_bumped_after_commit(self, admin_client, user):
+        titles, _, _ = create_titles(admin_client)
+        version = get_titles_version()
+        with transaction.atomic():
+            Review.objects.create(
+                title=Title.objects.get(pk=titles[0]['id']),
+                author=User.objects.get(pk=user.pk), text='Текст', score=5,
+            )
+            assert get_titles_version() == version, (
+                'Версия кеша не должна меняться до фиксации транзакции.'
+            )
+        assert get_titles_version() != version
@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from reviews.search import SEARCH_TABLE
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleNameSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def create_title(self, admin_client, name):
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': name,
+            'year': 1994,
+            'genre': [self.genres[0]['slug']],
+            'category': self.categories[0]['slug'],
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        return response.json()
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, {'name': query})
+        assert response.status_code == HTTPStatus.OK
+        return sorted(title['name'] for title in response.json()['results'])
+
+    def test_01_cyrillic_case_insensitive(self, client, admin_client):
+        self.genres = create_genre(admin_client)
+        self.categories = create_categories(admin_client)
+        self.create_title(admin_client, 'Побег из Шоушенка')
+        self.create_title(admin_client, 'Ёлки')
+        self.create_title(admin_client, 'Shrek')
+
+        assert self.search(client, 'шоушенк') == ['Побег из Шоушенка'], (
+            'Поиск по названию должен быть нечувствителен к регистру '
+            'для кириллицы.'
+        )
+        assert self.search(client, 'ПОБЕГ ИЗ') == ['Побег из Шоушенка']
+        assert self.search(client, 'из') == ['Побег из Шоушенка']
+        assert self.search(client, 'елки') == ['Ёлки']
+        assert self.search(client, 'SHR') == ['Shrek']
+        assert self.search(client, 'Матрица') == []
+
+    def test_02_search_follows_renames(self, client, admin_client):
+        self.genres = create_genre(admin_client)
+        self.categories = create_categories(admin_client)
+        title = self.create_title(admin_client, 'Старое название')
+        admin_client.patch(
+            f'{self.TITLES_URL}{title["id"]}/', data={'name': 'Новое имя'}
+        )
+        assert self.search(client, 'старое') == []
+        assert self.search(client, 'новое') == ['Новое имя']
+
+    def test_03_search_index_exists(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('FTS5-индекс создаётся только для SQLite.')
+        assert SEARCH_TABLE in connection.introspection.table_names()
@@ -0,0 +1,49 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleSlugFilters:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def filter_names(self, client, **params):
+        response = client.get(self.TITLES_URL, params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        names = [title['name'] for title in data['results']]
+        assert data['count'] == len(names), (
+            'Фильтр по жанрам не должен дублировать произведения.'
+        )
+        return sorted(names)
+
+    def test_01_genre_any_and_all(self, client, admin_client):
+        # Терминатор: horror, comedy; Крепкий орешек: drama.
+        create_titles(admin_client)
+        assert self.filter_names(client, genre='comedy') == ['Терминатор']
+        assert self.filter_names(client, genre='com') == [], (
+            'Фильтр по slug жанра должен сравнивать slug точно.'
+        )
+        assert self.filter_names(client, genre='horror,comedy,drama') == [
+            'Крепкий орешек', 'Терминатор'
+        ]
+        assert self.filter_names(
+            client, genre='horror,comedy', genre_match='all'
+        ) == ['Терминатор']
+        assert self.filter_names(
+            client, genre='horror,drama', genre_match='all'
+        ) == []
+        assert self.filter_names(
+            client, genre='horror,unknown', genre_match='all'
+        ) == []
+
+    def test_02_category_multiple_slugs(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.filter_names(client, category='films') == ['Терминатор']
+        assert self.filter_names(client, category='films,books') == [
+            'Крепкий орешек', 'Терминатор'
+        ]
+        assert self.filter_names(client, category='film') == []
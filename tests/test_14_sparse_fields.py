@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14SparseFieldsets:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_title_list_fields(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                self.TITLES_URL, {'fields': 'id,name,year,rating'}
+            )
+        assert response.status_code == HTTPStatus.OK
+        for title in response.json()['results']:
+            assert set(title) == {'id', 'name', 'year', 'rating'}, (
+                'Параметр `fields` должен оставлять в ответе только '
+                'запрошенные поля.'
+            )
+        assert len(queries) == 2, (
+            'Незапрошенные связи (жанры, категория) не должны загружаться.'
+        )
+        assert all('description' not in query['sql'] for query in queries)
+
+        response = client.get(self.TITLES_URL, {'fields': 'category,genre'})
+        assert response.status_code == HTTPStatus.OK
+        title = response.json()['results'][0]
+        assert set(title) == {'category', 'genre'}
+        assert set(title['category']) == {'name', 'slug'}
+
+    def test_02_unknown_field(self, client):
+        response = client.get(self.TITLES_URL, {'fields': 'id,secret'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_review_and_comment_fields(self, client, admin_client, admin,
+                                          user_client, user):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        response = client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            {'fields': 'id,score'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [set(review) for review in response.json()['results']] == [
+            {'id', 'score'}
+        ] * len(reviews)
+
+        response = client.get(
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+            {'fields': 'text'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert sorted(
+            comment['text'] for comment in response.json()['results']
+        ) == sorted(comment['text'] for comment in comments)
+        assert all(
+            set(comment) == {'text'}
+            for comment in response.json()['results']
+        )
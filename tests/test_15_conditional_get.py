@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def assert_not_modified(self, client, url, django_assert_num_queries,
+                            queries, **headers):
+        with django_assert_num_queries(queries):
+            response = client.get(url, **headers)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Повторный условный GET-запрос к `{url}` без изменений данных '
+            'должен возвращать ответ со статусом 304.'
+        )
+
+    def test_01_title_etag(self, client, admin_client,
+                           django_assert_num_queries, admin):
+        _, _, titles = create_comments(admin_client, {admin: admin_client})
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        etag = client.get(url)['ETag']
+        self.assert_not_modified(
+            client, url, django_assert_num_queries, 1, HTTP_IF_NONE_MATCH=etag
+        )
+        list_etag = client.get(self.TITLES_URL)['ETag']
+        self.assert_not_modified(
+            client, self.TITLES_URL, django_assert_num_queries, 0,
+            HTTP_IF_NONE_MATCH=list_etag
+        )
+
+        admin_client.patch(url, data={'name': 'Терминатор 2'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'После изменения произведения ETag должен измениться.'
+        )
+        assert response.json()['name'] == 'Терминатор 2'
+        response = client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=list_etag)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_02_reviews_and_comments_validators(
+            self, client, admin_client, admin, user_client, user,
+            django_assert_num_queries
+    ):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        comments_url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        for url in (reviews_url, comments_url):
+            response = client.get(url)
+            assert 'Last-Modified' not in response, (
+                'Дата публикации не меняется при правке, поэтому '
+                'Last-Modified по ней отдавать нельзя.'
+            )
+            self.assert_not_modified(
+                client, url, django_assert_num_queries, 1,
+                HTTP_IF_NONE_MATCH=response['ETag']
+            )
+
+        etag = client.get(reviews_url)['ETag']
+        admin_client.patch(
+            f'{reviews_url}{reviews[0]["id"]}/', data={'text': 'Новый текст'}
+        )
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Изменение отзыва должно менять ETag списка отзывов.'
+        )
+
+        etag = client.get(comments_url)['ETag']
+        admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Удаление комментария должно менять ETag списка комментариев.'
+        )
+
+        etag = client.get(reviews_url)['ETag']
+        create_single_review(user_client, titles[0]['id'], 'Текст', 3)
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 2
+
+    def test_03_author_rename_changes_etag(self, client, user_client, user,
+                                           admin_client, admin):
+        comments, reviews, titles = create_comments(
+            admin_client, {user: user_client}
+        )
+        urls = (
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+        )
+        etags = [client.get(url)['ETag'] for url in urls]
+        response = user_client.patch(
+            '/api/v1/users/me/', data={'username': 'renamed'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                'Смена username автора должна менять ETag списка.'
+            )
+            assert response.json()['results'][0]['author'] == 'renamed'
+
+    def test_04_invalid_title_id(self, client):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id='abc')
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Запрос произведения с некорректным id должен возвращать 404.'
+        )
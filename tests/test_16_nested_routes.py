@@ -0,0 +1,51 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16NestedRoutes:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_comments_require_matching_title(self, admin_client, admin):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        other_title_id = titles[1]['id']
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=other_title_id, review_id=reviews[0]['id']
+        )
+        assert admin_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+            'Комментарии к отзыву, который относится к другому '
+            'произведению, должны быть недоступны.'
+        )
+        response = admin_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = admin_client.get(f'{url}{comments[0]["id"]}/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_parent_lookup_is_one_query(self, client, admin_client, admin,
+                                           django_assert_num_queries):
+        _, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        # Родитель с валидаторами, COUNT(*) и страница комментариев.
+        with django_assert_num_queries(3):
+            response = client.get(
+                self.COMMENTS_URL_TEMPLATE.format(
+                    title_id=titles[0]['id'], review_id=reviews[0]['id']
+                ),
+                {'fields': 'id,text'}
+            )
+        assert response.status_code == HTTPStatus.OK
+        with django_assert_num_queries(1):
+            response = client.get(
+                self.REVIEWS_URL_TEMPLATE.format(title_id=999999)
+            )
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,26 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17DuplicateReview:
+
+    def test_01_duplicate_review_is_rejected(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        create_single_review(user_client, title_id, 'Первый отзыв', 6)
+
+        response = user_client.post(url, data={'text': 'Ещё', 'score': 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {
+            'non_field_errors': ['Отзыв уже существует.']
+        }
+        assert Review.objects.filter(title_id=title_id).count() == 1
+        assert Title.objects.get(pk=title_id).rating == 6, (
+            'Отклонённый повторный отзыв не должен менять рейтинг.'
+        )
@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.authentication import RoleAccessToken, token_version_key
+from reviews.models import User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}'
+    )
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18StatelessTokens:
+
+    USERS_URL = '/api/v1/users/'
+
+    def test_01_reads_skip_user_table(self, admin, user,
+                                      django_assert_num_queries):
+        client = client_for(admin)
+        client.get(self.USERS_URL)
+        # Версия токенов уже в кеше: остаются COUNT(*) и выборка.
+        with django_assert_num_queries(2):
+            response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK
+        response = client_for(user).get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username
+
+    def test_02_role_change_revokes_tokens(self, admin_client, moderator):
+        client = client_for(moderator)
+        assert client.get(self.USERS_URL).status_code == HTTPStatus.FORBIDDEN
+
+        admin_client.patch(
+            f'{self.USERS_URL}{moderator.username}/', data={'role': 'admin'}
+        )
+        assert client.get(
+            self.USERS_URL
+        ).status_code == HTTPStatus.UNAUTHORIZED, (
+            'После смены роли старый токен должен перестать действовать.'
+        )
+        moderator.refresh_from_db()
+        response = client_for(moderator).get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_03_deleted_user_token_revoked(self, admin_client, user):
+        client = client_for(user)
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+        admin_client.delete(f'{self.USERS_URL}{user.username}/')
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_04_deleted_user_with_cached_version(self, user):
+        client = client_for(user)
+        assert client.get('/api/v1/titles/').status_code == HTTPStatus.OK
+        User.objects.filter(pk=user.pk).delete()
+        # Удаление в другом процессе: здесь версия токенов ещё в кеше.
+        cache.set(token_version_key(user.pk), user.token_version)
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Токен удалённого пользователя не должен приводить к ошибке 500.'
+        )
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.user_cache import UserLRUCache
+from reviews.models import ConfirmationCode
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19AuthUserCache:
+
+    STATS_URL = '/api/v1/auth/user-cache/'
+
+    def test_01_user_is_cached_between_requests(
+            self, user_client, admin_client, user, django_assert_num_queries
+    ):
+        user_client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username
+        stats = admin_client.get(self.STATS_URL).json()
+        assert stats['hits'] >= 1
+        assert stats['misses'] >= 2
+
+    def test_02_role_change_evicts_user(self, admin_client, user_client,
+                                        user):
+        assert user_client.get(
+            self.STATS_URL
+        ).status_code == HTTPStatus.FORBIDDEN
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert user_client.get(self.STATS_URL).status_code == HTTPStatus.OK, (
+            'Изменение пользователя должно вытеснять его из кеша.'
+        )
+
+    def test_03_lru_bounds(self, user, admin, moderator):
+        cache = UserLRUCache(maxsize=2, ttl=60)
+        cache.put(user.pk, user)
+        cache.put(admin.pk, admin)
+        assert cache.get(user.pk) == user
+        cache.put(moderator.pk, moderator)
+        assert cache.get(admin.pk) is None, (
+            'Из переполненного кеша вытесняется давно не использованная '
+            'запись.'
+        )
+        assert cache.get(user.pk) is not cache.get(user.pk)
+        assert cache.stats()['size'] == 2
+
+        expired = UserLRUCache(maxsize=2, ttl=-1)
+        expired.put(user.pk, user)
+        assert expired.get(user.pk) is None
+
+    def test_04_issued_tokens_use_cache(self, client, django_assert_num_queries):
+        client.post('/api/v1/auth/signup/', data={
+            'email': 'cached@yamdb.fake', 'username': 'cached'
+        })
+        code = ConfirmationCode.objects.get(user__username='cached').code
+        token = client.post('/api/v1/auth/token/', data={
+            'username': 'cached', 'confirmation_code': code
+        }).json()['token']
+        token_client = APIClient()
+        token_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        token_client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            response = token_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == 'cached', (
+            'Запись пользователя для токена из /auth/token/ должна '
+            'браться из кеша.'
+        )
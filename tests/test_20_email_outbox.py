@@ -0,0 +1,106 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.emails import claim_emails, queue_email
+from reviews.models import OutgoingEmail
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class UnreachableBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+    def send_messages(self, messages):
+        raise AssertionError('Соединение не открыто.')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20EmailOutbox:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def signup(self, client):
+        response = client.post(self.URL_SIGNUP, data={
+            'email': 'outbox@yamdb.fake', 'username': 'outbox_user'
+        })
+        assert response.status_code == HTTPStatus.OK
+
+    def test_01_signup_queues_email(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        outbox_before = len(mail.outbox)
+        self.signup(client)
+        assert len(mail.outbox) == outbox_before, (
+            'Без EMAIL_OUTBOX_EAGER регистрация не должна ждать отправки.'
+        )
+        assert OutgoingEmail.objects.filter(
+            recipient='outbox@yamdb.fake', sent_at__isnull=True
+        ).exists()
+
+        call_command('send_emails', '--batch-size', '1')
+        assert len(mail.outbox) == outbox_before + 1
+        assert mail.outbox[-1].to == ['outbox@yamdb.fake']
+        assert not OutgoingEmail.objects.filter(
+            sent_at__isnull=True
+        ).exists()
+
+    def test_02_failed_email_is_retried_later(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        self.signup(client)
+        settings.EMAIL_BACKEND = f'{__name__}.FailingBackend'
+        call_command('send_emails')
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is None
+        assert email.attempts == 1
+        assert 'SMTP' in email.last_error
+        assert email.send_after > timezone.now(), (
+            'Повторная отправка должна откладываться.'
+        )
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        OutgoingEmail.objects.update(send_after=timezone.now())
+        call_command('send_emails')
+        assert OutgoingEmail.objects.get().sent_at is not None
+
+    def test_03_eager_email_is_leased(self):
+        outbox_before = len(mail.outbox)
+        with transaction.atomic():
+            queue_email('eager@yamdb.fake', 'Тема', 'Текст')
+            assert claim_emails(10) == [], (
+                'Письмо, отправляемое сразу, не должен забирать '
+                'обработчик очереди.'
+            )
+        assert len(mail.outbox) == outbox_before + 1
+        assert OutgoingEmail.objects.get().sent_at is not None
+
+    def test_04_unreachable_server_is_retried_later(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        self.signup(client)
+        settings.EMAIL_BACKEND = f'{__name__}.UnreachableBackend'
+        call_command('send_emails')
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is None
+        assert email.attempts == 1, (
+            'Ошибка соединения должна считаться неудачной попыткой.'
+        )
+        assert 'SMTP' in email.last_error
+        assert email.send_after > timezone.now()
+
+        settings.EMAIL_OUTBOX_EAGER = True
+        response = client.post(self.URL_SIGNUP, data={
+            'email': 'eager@yamdb.fake', 'username': 'eager_user'
+        })
+        assert response.status_code == HTTPStatus.OK, (
+            'Ошибка соединения не должна ломать запрос регистрации.'
+        )
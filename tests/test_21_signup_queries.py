@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.throttling import forget_code_sent
+from reviews.models import ConfirmationCode
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21SignupQueries:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def user_statements(self, client, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(self.URL_SIGNUP, data=data)
+        return response, [
+            query['sql'] for query in queries
+            if '"reviews_user"' in query['sql']
+        ]
+
+    def test_01_signup_user_statements(self, client):
+        data = {'email': 'upsert@yamdb.fake', 'username': 'upsert'}
+        response, statements = self.user_statements(client, data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(statements) == 2, (
+            'Регистрация нового пользователя - это поиск и INSERT.'
+        )
+        assert ConfirmationCode.objects.filter(
+            user__username='upsert'
+        ).exists()
+
+        # Окно повтора отправки здесь не проверяется.
+        forget_code_sent('upsert')
+        response, statements = self.user_statements(client, data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(statements) == 1, (
+            'Повторная регистрация - это только поиск пользователя, '
+            'новый код пишется в отдельную таблицу.'
+        )
+
+    def test_02_conflicts_need_one_lookup(self, client):
+        client.post(self.URL_SIGNUP, data={
+            'email': 'first@yamdb.fake', 'username': 'first'
+        })
+        response, statements = self.user_statements(client, {
+            'email': 'other@yamdb.fake', 'username': 'first'
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'username' in response.json()
+        assert len(statements) == 1
+
+        response, statements = self.user_statements(client, {
+            'email': 'first@yamdb.fake', 'username': 'other'
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'email' in response.json()
+        assert len(statements) == 1
@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.throttling import AuthIdentityThrottle, AuthIPThrottle
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22AuthThrottling:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    def test_01_resend_window_skips_email_and_db(self, client):
+        data = {'email': 'again@yamdb.fake', 'username': 'again'}
+        response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        outbox_size = len(mail.outbox)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == data
+        assert len(queries) == 0, (
+            'Повторная регистрация в пределах окна не должна '
+            'обращаться к базе данных.'
+        )
+        assert len(mail.outbox) == outbox_size, (
+            'Повторная регистрация в пределах окна не должна '
+            'отправлять новое письмо.'
+        )
+
+    def test_02_failed_token_reopens_window(self, client):
+        data = {'email': 'reset@yamdb.fake', 'username': 'reset'}
+        client.post(self.URL_SIGNUP, data=data)
+        client.post(self.URL_TOKEN, data={
+            'username': 'reset', 'confirmation_code': 'wrong'
+        })
+        outbox_size = len(mail.outbox)
+        response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_size + 1, (
+            'После неверного кода повторная регистрация должна '
+            'выслать новый код.'
+        )
+
+    def test_03_identity_bucket(self, client, monkeypatch):
+        monkeypatch.setattr(
+            AuthIdentityThrottle, 'rate', '2/min', raising=False
+        )
+        data = {'username': 'nobody', 'confirmation_code': '000000'}
+        for _ in range(2):
+            response = client.post(self.URL_TOKEN, data=data)
+            assert response.status_code != HTTPStatus.TOO_MANY_REQUESTS
+        response = client.post(self.URL_TOKEN, data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Запросы сверх ёмкости ведра должны получать ответ 429.'
+        )
+        assert 'Retry-After' in response
+
+        response = client.post(self.URL_TOKEN, data={
+            'username': 'somebody', 'confirmation_code': '000000'
+        })
+        assert response.status_code != HTTPStatus.TOO_MANY_REQUESTS, (
+            'Ведро считается отдельно для каждого адреса.'
+        )
+
+    def test_04_ip_bucket(self, client, monkeypatch):
+        monkeypatch.setattr(AuthIPThrottle, 'rate', '1/min', raising=False)
+        client.post(self.URL_SIGNUP, data={})
+        response = client.post(self.URL_SIGNUP, data={})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    @pytest.mark.parametrize('url', (URL_SIGNUP, URL_TOKEN))
+    def test_05_non_object_body(self, client, url):
+        response = client.post(url, data=[], content_type='application/json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Тело запроса не в виде объекта должно получать ответ 400.'
+        )
+
+    def test_06_long_email_key(self, client, recwarn):
+        email = 'a' * 240 + '@yamdb.fake'
+        client.post(self.URL_SIGNUP, data={'email': email, 'username': 'x'})
+        assert not [
+            warning for warning in recwarn
+            if warning.category.__name__ == 'CacheKeyWarning'
+        ], 'Ключ ведра не должен зависеть от длины email.'
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews.models import ConfirmationCode
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23ConfirmationCodes:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    def signup(self, client, username):
+        response = client.post(self.URL_SIGNUP, data={
+            'email': f'{username}@yamdb.fake', 'username': username
+        })
+        assert response.status_code == HTTPStatus.OK
+        return ConfirmationCode.objects.get(user__username=username)
+
+    def obtain(self, client, username, code):
+        return client.post(self.URL_TOKEN, data={
+            'username': username, 'confirmation_code': code
+        })
+
+    def test_01_failed_login_does_not_write_user(self, client):
+        confirmation = self.signup(client, 'coder')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.obtain(client, 'coder', 'wrong')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert not any(
+            query['sql'].startswith('UPDATE "reviews_user"')
+            for query in queries
+        ), 'Неверный код не должен изменять строку пользователя.'
+        confirmation.refresh_from_db()
+        assert confirmation.attempts == 1
+
+        response = self.obtain(client, 'coder', confirmation.code)
+        assert response.status_code == HTTPStatus.OK, (
+            'Верный код должен действовать после неверной попытки.'
+        )
+
+    def test_02_code_burns_after_max_attempts(self, client, settings):
+        settings.CONFIRMATION_CODE_MAX_ATTEMPTS = 2
+        confirmation = self.signup(client, 'burner')
+        for _ in range(2):
+            self.obtain(client, 'burner', 'wrong')
+        response = self.obtain(client, 'burner', confirmation.code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'После исчерпания попыток код не должен приниматься.'
+        )
+
+        confirmation = self.signup(client, 'burner')
+        assert confirmation.attempts == 0
+        response = self.obtain(client, 'burner', confirmation.code)
+        assert response.status_code == HTTPStatus.OK, (
+            'Повторная регистрация должна выдавать новый код.'
+        )
+
+    def test_03_expired_code(self, client):
+        confirmation = self.signup(client, 'late')
+        ConfirmationCode.objects.filter(pk=confirmation.pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        response = self.obtain(client, 'late', confirmation.code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Просроченный код не должен приниматься.'
+        )
+
+    def test_04_purge_command(self, client):
+        for username in ('first', 'second', 'third'):
+            self.signup(client, username)
+        ConfirmationCode.objects.exclude(user__username='third').update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        call_command('purge_confirmation_codes', '--batch-size', '1')
+        assert list(ConfirmationCode.objects.values_list(
+            'user__username', flat=True
+        )) == ['third'], 'Команда должна удалить только просроченные коды.'
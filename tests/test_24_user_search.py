@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+
+from reviews.models import User
+from reviews.search import search_users
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24UserSearch:
+
+    USERS_URL = '/api/v1/users/'
+
+    def search(self, client, query):
+        response = client.get(self.USERS_URL, data=query)
+        return [item['username'] for item in response.json()['results']]
+
+    def test_01_prefix_and_role(self, admin_client, moderator, user):
+        User.objects.create(
+            username='Ёжик', email='hedgehog@yamdb.fake', first_name='Пётр'
+        )
+        assert self.search(admin_client, {'search': 'testu'}) == [
+            'TestUser'
+        ], 'Поиск должен находить логин по началу без учёта регистра.'
+        assert self.search(admin_client, {'search': 'testmoder@'}) == [
+            'TestModerator'
+        ], 'Поиск должен находить пользователя по началу email.'
+        assert self.search(admin_client, {'search': 'ежик'}) == ['Ёжик'], (
+            'Поиск должен учитывать замену «ё» на «е».'
+        )
+        assert self.search(admin_client, {'search': 'moderator'}) == [
+            'TestModerator'
+        ], 'Поиск должен находить пользователей по роли.'
+        assert self.search(admin_client, {'search': 'user'}) == [
+            'TestUser', 'Ёжик'
+        ]
+        assert self.search(admin_client, {'search': 'estuser'}) == [], (
+            'В режиме по умолчанию поиск идёт только по началу строки.'
+        )
+
+    def test_02_full_mode(self, admin_client, user):
+        User.objects.create(
+            username='ivan', email='ivan@yamdb.fake', last_name='Петров'
+        )
+        assert self.search(admin_client, {
+            'search': 'етро', 'search_mode': 'full'
+        }) == ['ivan']
+        assert self.search(admin_client, {
+            'search': 'estuser', 'search_mode': 'full'
+        }) == ['TestUser']
+
+    def test_03_renamed_user_is_found(self, admin_client, user):
+        user.username = 'Renamed'
+        user.save(update_fields=['username'])
+        assert self.search(admin_client, {'search': 'ren'}) == ['Renamed']
+
+    def test_04_prefix_search_uses_indexes(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется только для SQLite.')
+        sql, params = search_users(
+            User.objects.all(), 'adm'
+        ).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        assert 'SCAN' not in plan, (
+            'Поиск по префиксу не должен просматривать всю таблицу.'
+        )
@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import RoleAccessToken
+from reviews.models import User
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25UsersBulk:
+
+    BULK_URL = '/api/v1/users/bulk/'
+
+    def post(self, client, data):
+        return client.post(self.BULK_URL, data=data, format='json')
+
+    def test_01_bulk_permissions(self, user_client, moderator_client):
+        client = APIClient()
+        data = {'usernames': ['TestUser'], 'action': 'delete'}
+        assert self.post(client, data).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+        for role_client in (user_client, moderator_client):
+            assert self.post(role_client, data).status_code == (
+                HTTPStatus.FORBIDDEN
+            ), 'Массовые операции доступны только администратору.'
+
+    def test_02_bulk_validation(self, admin_client):
+        for data in (
+            {'usernames': [], 'action': 'delete'},
+            {'usernames': ['TestUser'], 'action': 'ban'},
+            {'usernames': ['TestUser'], 'action': 'set_role'},
+            {'usernames': ['TestUser'], 'action': 'set_role',
+             'role': 'owner'},
+        ):
+            assert self.post(admin_client, data).status_code == (
+                HTTPStatus.BAD_REQUEST
+            ), f'Некорректный запрос должен возвращать 400: {data}'
+
+    def test_03_bulk_set_role(self, admin_client, admin, user,
+                              moderator_client, moderator):
+        usernames = [user.username, moderator.username, admin.username,
+                     'ghost']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(admin_client, {
+                'usernames': usernames, 'action': 'set_role',
+                'role': 'moderator',
+            })
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'] == [
+            {'username': user.username, 'status': 'updated'},
+            {'username': moderator.username, 'status': 'unchanged'},
+            {'username': admin.username, 'status': 'forbidden'},
+            {'username': 'ghost', 'status': 'not_found'},
+        ]
+        updates = [
+            query for query in queries
+            if query['sql'].startswith('UPDATE "reviews_user"')
+        ]
+        assert len(updates) == 1, 'Роль должна меняться одним UPDATE.'
+
+        user.refresh_from_db()
+        assert user.role == 'moderator'
+        assert user.token_version == 1, (
+            'Смена роли должна отзывать выданные токены.'
+        )
+        moderator.refresh_from_db()
+        assert moderator.token_version == 0
+
+    def test_04_bulk_role_revokes_cached_token(self, admin_client, user):
+        user_client = APIClient()
+        user_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}'
+        )
+        assert user_client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.OK
+        )
+        self.post(admin_client, {
+            'usernames': [user.username], 'action': 'set_role',
+            'role': 'admin',
+        })
+        assert user_client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'Токен со старой ролью должен перестать действовать.'
+
+    def test_05_bulk_delete(self, admin_client, user, moderator):
+        response = self.post(admin_client, {
+            'usernames': [user.username, moderator.username, user.username],
+            'action': 'delete',
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'] == [
+            {'username': user.username, 'status': 'deleted'},
+            {'username': moderator.username, 'status': 'deleted'},
+        ]
+        assert not User.objects.filter(
+            username__in=[user.username, moderator.username]
+        ).exists()
+
+    def test_06_bulk_username_reserved(self, client):
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'bulk', 'email': 'bulk@yamdb.fake'
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,342 @@
+import csv
+import shutil
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.importer import TABLES, CsvImporter, batched, import_order
+from reviews.models import Category, Comment, Review, Title, User
+from reviews.ratings import find_stale_ratings
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+
+
+def count_rows(file_name):
+    with open(DATA_DIR / file_name, encoding='utf-8') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_import(data_dir, **kwargs):
+    importer = CsvImporter(data_dir, **kwargs)
+    counts = {
+        spec.name: stats and stats.written
+        for spec, stats in importer.run()
+    }
+    importer.finish()
+    return [counts[spec.name] for spec in TABLES]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26ImportCsv:
+
+    def test_01_import_command(self):
+        call_command('import_csv')
+        assert Title.objects.count() == count_rows('titles.csv')
+        assert Review.objects.count() == count_rows('review.csv')
+        assert Comment.objects.count() == count_rows('comments.csv')
+        assert Title.genre.through.objects.count() == count_rows(
+            'genre_title.csv'
+        )
+        call_command('rebuild_ratings', '--check')
+        assert not Title.objects.filter(search_name='').exists(), (
+            'Импорт должен заполнять поле поиска произведений.'
+        )
+        assert not User.objects.filter(search_username='').exists()
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Импорт должен сохранять дату публикации из файла.'
+        )
+
+    def test_02_bulk_queries(self, tmp_path):
+        for file_name in ('users.csv', 'category.csv', 'titles.csv',
+                          'review.csv'):
+            shutil.copy(DATA_DIR / file_name, tmp_path)
+        with CaptureQueriesContext(connection) as queries:
+            run_import(tmp_path)
+        assert len(queries) < count_rows('review.csv'), (
+            'Импорт должен писать пачками, а не запросом на строку.'
+        )
+
+    def test_03_reimport_updates_rows(self, tmp_path):
+        write_csv(tmp_path / 'users.csv', [
+            {'id': 1, 'username': 'reader', 'email': 'reader@yamdb.fake',
+             'role': 'user', 'bio': '', 'first_name': '', 'last_name': ''},
+        ])
+        write_csv(tmp_path / 'category.csv', [
+            {'id': 1, 'name': 'Фильм', 'slug': 'movie'},
+        ])
+        write_csv(tmp_path / 'titles.csv', [
+            {'id': 1, 'name': 'Ёлка', 'year': 2000, 'category': 1},
+            {'id': 2, 'name': 'Сирота', 'year': 2000, 'category': 9},
+        ])
+        warnings = []
+        assert run_import(tmp_path, warn=warnings.append)[:4] == [
+            1, 1, None, 1
+        ]
+        assert len(warnings) == 1, (
+            'Строка с несуществующей категорией должна быть пропущена.'
+        )
+        assert Title.objects.get(pk=1).search_name == 'елка'
+
+        write_csv(tmp_path / 'users.csv', [
+            {'id': 1, 'username': 'reader', 'email': 'reader@yamdb.fake',
+             'role': 'admin', 'bio': '', 'first_name': '', 'last_name': ''},
+        ])
+        write_csv(tmp_path / 'titles.csv', [
+            {'id': 1, 'name': 'Ель', 'year': 2001, 'category': 1},
+        ])
+        run_import(tmp_path)
+        title = Title.objects.get(pk=1)
+        assert (title.name, title.year, title.search_name) == (
+            'Ель', 2001, 'ель'
+        )
+        user = User.objects.get(pk=1)
+        assert user.role == 'admin'
+        assert user.token_version == 1, (
+            'Смена роли при импорте должна отзывать токены.'
+        )
+
+    def test_04_batches_commit_separately(self, tmp_path):
+        shutil.copy(DATA_DIR / 'users.csv', tmp_path)
+        importer = CsvImporter(tmp_path, batch_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            [(_, stats)] = importer.run([TABLES[0]])
+        count = stats.written
+        transactions = [
+            query for query in queries if query['sql'] == 'BEGIN'
+        ]
+        assert count == count_rows('users.csv')
+        assert len(transactions) == (count + 1) // 2, (
+            'Каждая пачка должна записываться в своей транзакции.'
+        )
+
+    def test_05_rows_are_streamed(self, tmp_path):
+        read = []
+
+        def rows():
+            for pk in range(1, 6):
+                read.append(pk)
+                yield {'id': pk, 'name': f'Жанр {pk}', 'slug': f'g{pk}'}
+
+        importer = CsvImporter(tmp_path, batch_size=2)
+        batches = batched(importer.build_objects(TABLES[2], rows(), ''), 2)
+        next(batches)
+        assert read == [1, 2], (
+            'Строки должны читаться по мере записи, а не целиком.'
+        )
+
+    def test_06_dependency_order(self):
+        order = [spec.model for spec in import_order(TABLES[::-1])]
+        for before, after in (
+            (Category, Title), (Title, Review), (User, Review),
+            (Review, Comment),
+        ):
+            assert order.index(before) < order.index(after), (
+                'Таблица должна импортироваться после тех, '
+                'на которые ссылается.'
+            )
+
+    def test_07_parallel_run(self, tmp_path):
+        for file_name in ('users.csv', 'category.csv', 'genre.csv',
+                          'titles.csv', 'review.csv', 'comments.csv'):
+            shutil.copy(DATA_DIR / file_name, tmp_path)
+        importer = CsvImporter(tmp_path, batch_size=3, workers=3)
+        counts = {
+            spec.model: stats and stats.written
+            for spec, stats in importer.run()
+        }
+        importer.finish()
+        assert counts[Review] == count_rows('review.csv')
+        assert Comment.objects.count() == count_rows('comments.csv')
+        call_command('rebuild_ratings', '--check')
+
+    def test_08_worker_error_is_raised(self, tmp_path):
+        shutil.copy(DATA_DIR / 'category.csv', tmp_path)
+        write_csv(tmp_path / 'titles.csv', [
+            {'id': 'x', 'name': 'Ошибка', 'year': 2000, 'category': 1},
+        ])
+        importer = CsvImporter(tmp_path, workers=2)
+        with pytest.raises(ValueError):
+            list(importer.run())
+        assert not Title.objects.exists()
+
+    def test_09_genre_title_step(self, tmp_path):
+        call_command(
+            'import_csv', '--steps', 'category', 'genre', 'titles'
+        )
+        assert not Title.genre.through.objects.exists()
+        links_path = tmp_path / 'links.csv'
+        write_csv(links_path, [
+            {'id': 1, 'title_id': 1, 'genre_id': 1},
+            {'id': 2, 'title_id': 1, 'genre_id': 2},
+            {'id': 3, 'title_id': 999, 'genre_id': 1},
+        ])
+        for expected_inserts in (1, 0):
+            version = Title.objects.get(pk=1).version
+            out = StringIO()
+            with CaptureQueriesContext(connection) as queries:
+                call_command(
+                    'import_csv', '--steps', 'genre_title',
+                    '--genre-title', str(links_path), stdout=out,
+                )
+            inserts = [
+                query for query in queries
+                if query['sql'].startswith('INSERT')
+                and '"reviews_title_genre"' in query['sql']
+            ]
+            assert len(inserts) == expected_inserts, (
+                'Связи должны вставляться одним запросом на пачку.'
+            )
+            assert f'добавлено {expected_inserts * 2},' in out.getvalue(), (
+                'В отчёт должны попадать только вставленные связи.'
+            )
+        assert Title.objects.get(pk=1).version == version, (
+            'Повторный импорт тех же связей не должен менять версию '
+            'произведения.'
+        )
+        assert sorted(Title.objects.get(pk=1).genre.values_list(
+            'pk', flat=True
+        )) == [1, 2], (
+            'Повторный импорт связей не должен создавать дубли.'
+        )
+        assert Title.genre.through.objects.count() == 2
+
+        write_csv(links_path, [{'id': 1, 'title_id': 1, 'genre_id': 1}])
+        call_command(
+            'import_csv', '--steps', 'genre_title', '--incremental',
+            '--delete-missing', '--genre-title', str(links_path),
+        )
+        assert list(Title.objects.get(pk=1).genre.values_list(
+            'pk', flat=True
+        )) == [1], 'Связь, исчезнувшая из файла, должна быть удалена.'
+
+    def test_10_incremental_import(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', [
+            {'id': 1, 'name': 'Фильм', 'slug': 'movie'},
+            {'id': 2, 'name': 'Книга', 'slug': 'book'},
+            {'id': 3, 'name': 'Музыка', 'slug': 'music'},
+        ])
+        args = ('import_csv', '--data-dir', str(tmp_path),
+                '--steps', 'category', '--incremental')
+        call_command(*args)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command(*args)
+        assert not any(
+            query['sql'].startswith(('INSERT', 'UPDATE'))
+            and '"reviews_category"' in query['sql']
+            for query in queries
+        ), 'Неизменённые строки не должны перезаписываться.'
+
+        write_csv(tmp_path / 'category.csv', [
+            {'id': 1, 'name': 'Кино', 'slug': 'movie'},
+            {'id': 2, 'name': 'Книга', 'slug': 'book'},
+            {'id': 4, 'name': 'Игры', 'slug': 'games'},
+        ])
+        Category.objects.create(id=10, name='Своя', slug='own')
+        importer = CsvImporter(tmp_path, incremental=True, batch_size=1)
+        [(_, stats)] = importer.run([TABLES[1]])
+        importer.delete_missing([TABLES[1]])
+        importer.finish()
+        assert (stats.inserted, stats.updated, stats.unchanged,
+                stats.deleted) == (1, 1, 1, 1)
+        assert sorted(Category.objects.values_list('slug', flat=True)) == [
+            'book', 'games', 'movie', 'own'
+        ], 'Удалять можно только строки, загруженные прошлым импортом.'
+        assert Category.objects.get(pk=1).name == 'Кино'
+
+    def test_11_incremental_restores_deleted_rows(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', [
+            {'id': 1, 'name': 'Фильм', 'slug': 'movie'},
+        ])
+        run_import(tmp_path)
+        Category.objects.all().delete()
+        assert run_import(tmp_path, incremental=True)[1] == 1, (
+            'Строка, удалённая из базы, должна быть создана заново.'
+        )
+        assert Category.objects.filter(slug='movie').exists()
+
+    def test_12_failed_import_rebuilds_ratings(self, tmp_path):
+        for file_name in ('users.csv', 'category.csv', 'titles.csv',
+                          'review.csv'):
+            shutil.copy(DATA_DIR / file_name, tmp_path)
+        write_csv(tmp_path / 'comments.csv', [
+            {'id': 'x', 'review_id': 1, 'text': 'Ошибка', 'author': 1,
+             'pub_date': '2019-09-24T21:08:21.567Z'},
+        ])
+        # Без шагов жанров ошибка в комментариях не остановит импорт
+        # раньше, чем будут записаны отзывы.
+        with pytest.raises(ValueError):
+            call_command(
+                'import_csv', '--data-dir', str(tmp_path), '--steps',
+                'users', 'category', 'titles', 'review', 'comments',
+            )
+        assert Review.objects.exists()
+        assert find_stale_ratings() == [], (
+            'Рейтинги уже записанных отзывов должны пересчитываться '
+            'и после ошибки импорта.'
+        )
+
+    def test_13_skipped_rows_are_not_deleted(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', [
+            {'id': 1, 'name': 'Фильм', 'slug': 'movie'},
+        ])
+        write_csv(tmp_path / 'titles.csv', [
+            {'id': 1, 'name': 'Ёлка', 'year': 2000, 'category': 1},
+        ])
+        run_import(tmp_path)
+        write_csv(tmp_path / 'titles.csv', [
+            {'id': 1, 'name': 'Ёлка', 'year': 2000, 'category': 9},
+        ])
+        importer = CsvImporter(tmp_path, incremental=True)
+        list(importer.run(TABLES[1:4]))
+        importer.delete_missing(TABLES[1:4])
+        importer.finish()
+        assert Title.objects.filter(pk=1).exists(), (
+            'Строка, пропущенная из-за битой ссылки, не исчезла из файла '
+            'и не должна удаляться.'
+        )
+
+    def test_14_moved_rows_update_old_parents(self, tmp_path):
+        for file_name in ('users.csv', 'category.csv', 'titles.csv'):
+            shutil.copy(DATA_DIR / file_name, tmp_path)
+        review = {'id': 1, 'title_id': 1, 'text': 'Отзыв', 'author': 100,
+                  'score': 9, 'pub_date': '2019-09-24T21:08:21.567Z'}
+        write_csv(tmp_path / 'review.csv', [
+            review,
+            {**review, 'id': 2, 'title_id': 2, 'author': 101, 'score': 5},
+        ])
+        comment = {'id': 1, 'review_id': 1, 'text': 'Комментарий',
+                   'author': 100, 'pub_date': '2019-09-24T21:08:21.567Z'}
+        write_csv(tmp_path / 'comments.csv', [comment])
+        run_import(tmp_path)
+        old_version = Review.objects.get(pk=2).version
+
+        write_csv(tmp_path / 'review.csv', [
+            {**review, 'title_id': 2},
+            {**review, 'id': 2, 'title_id': 2, 'author': 101, 'score': 5},
+        ])
+        write_csv(tmp_path / 'comments.csv', [{**comment, 'review_id': 2}])
+        version = Review.objects.get(pk=1).version
+        importer = CsvImporter(tmp_path)
+        list(importer.run(TABLES[5:]))
+        importer.finish()
+        assert find_stale_ratings() == [], (
+            'Перенос отзыва должен пересчитывать рейтинг и прежнего '
+            'произведения.'
+        )
+        assert Review.objects.get(pk=1).version > version, (
+            'Перенос комментария должен менять версию прежнего отзыва.'
+        )
+        assert Review.objects.get(pk=2).version > old_version